@@ -0,0 +1,125 @@
+from ..comm.bus import simulated_bus
+from ..robot import core, hexapod, pro, dancing
+from ..robot.control import ControlLoop
+from ..robot.dancing import DancingHexapod
+from contextlib import contextmanager
+import os
+import sys
+import time
+
+cpu_time = getattr(time, 'process_time', time.clock)
+
+
+hexapod_routines = ['boot_up', 'shut_down', 'walk', 'rotate', 'default',
+                    'lie_down', 'get_up', 'curl_up', 'lie_flat']
+
+pro_routines = ['shake_head', 'point', 'wave', 'dance_twist', 'lean_back', 'type_stuff',
+                'tilt_left_and_right', 'tilt_front_and_back', 'dance_tilt', 'rock_body']
+
+dancing_routines = ['prepare', 'night_fever', 'thriller']
+
+plantoid_routines = ['do_neutral_stance', 'do_walk_stance',
+                     'walk_forward', 'walk_backward', 'rotate_cw', 'rotate_ccw',
+                     'squat_routine', 'tiptoe_routine', 'dance_routine',
+                     'tiptoe_walk_forward', 'tiptoe_walk_backward',
+                     'tiptoe_rotate_cw', 'tiptoe_rotate_ccw', 'tiptoe_dance_routine']
+
+
+class SleepRecorder:
+    """ stands in for sleep(), adds up the requested time instead of sleeping.
+        clock() is a virtual clock that only advances by the slept time and the
+        modelled time of the bus, so that ControlLoop deadlines are reproducible """
+
+    def __init__(self, bus = None):
+        self.total, self.calls = 0.0, 0
+        self.bus = bus
+
+    def __call__(self, t):
+        self.total += t
+        self.calls += 1
+
+    def clock(self):
+        return self.total + (self.bus.time if self.bus is not None else 0.0)
+
+
+@contextmanager
+def patched_sleep(sleeper, modules):
+    """ replaces the sleep of every module in modules, e.g. the `from time import sleep` ones """
+
+    saved = [(module, module.sleep) for module in modules if hasattr(module, 'sleep')]
+
+    for module, _ in saved:
+        module.sleep = sleeper
+    try:
+        yield sleeper
+    finally:
+        for module, sleep in saved:
+            module.sleep = sleep
+
+
+@contextmanager
+def quiet():
+    """ sends stdout to /dev/null, the writes are still paid for """
+
+    stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    try:
+        yield
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+def robot_routine(name):
+    return name, lambda robot: getattr(robot, name)()
+
+
+def plantoid_routine(name):
+
+    def run(robot):
+        import plantoid_version1 as plantoid
+        plantoid.setup(robot)
+        getattr(plantoid, name)()
+
+    return 'plantoid.' + name, run
+
+
+def routines():
+    """ (name, run(robot)) for every built-in routine """
+
+    return ([robot_routine(name) for name in hexapod_routines + pro_routines + dancing_routines] +
+            [plantoid_routine(name) for name in plantoid_routines])
+
+
+def sleeping_modules():
+    return [module for module in (time, core, hexapod, pro, dancing, sys.modules.get('plantoid_version1'))
+            if module is not None]
+
+
+def measure(run, speed = 100000, overhead = 0.0, broadcast = 0x70):
+    """ runs run(robot) on a DancingHexapod on a simulated bus, starting from lie_flat(),
+        and returns its I2C transactions, bytes, modelled bus time, CPU time, slept time,
+        wall time (which excludes the sleeps) and the LED registers every driver ended
+        with. broadcast is the address of Drivers.broadcast, None to not broadcast """
+
+    import plantoid_version1     # so that its sleep is recorded as well
+
+    bus = simulated_bus(speed, overhead)
+    sleeper = SleepRecorder(bus)
+
+    with patched_sleep(sleeper, sleeping_modules()), quiet():
+
+        robot = DancingHexapod(bus = bus, control = ControlLoop(clock = sleeper.clock, sleep = sleeper))
+        robot.drivers.broadcast = broadcast
+        robot.lie_flat()
+
+        bus.reset()
+        sleeper.total = 0.0
+
+        wall, cpu = time.time(), cpu_time()
+        run(robot)
+        cpu, wall = cpu_time() - cpu, time.time() - wall
+
+    return {'transactions': bus.transactions, 'bytes': bus.bytes, 'bus_time': bus.time,
+            'cpu_time': cpu, 'sleep_time': sleeper.total, 'wall_time': wall,
+            'registers': dict((driver.address, bus.devices[driver.address].registers[6:70])
+                              for driver in robot.drivers)}
@@ -0,0 +1,94 @@
+""" Benchmarks every built-in routine on a simulated bus and compares it to baseline.json
+
+    $ python -m hexy.bench.run                  # fails if a routine got more expensive
+    $ python -m hexy.bench.run --update         # records the current numbers as the baseline
+    $ python -m hexy.bench.run walk thriller    # only these routines
+
+    Every routine is also run without broadcasting to the drivers, it fails if any
+    driver ends up with different registers than with. 
+    Run it from the repository root so that plantoid_version1 can be imported. """
+
+from .harness import measure, routines
+import argparse
+import json
+import os
+import sys
+
+baseline_path = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# deterministic on the simulated bus, so any increase beyond the tolerance is a regression
+compared = ['transactions', 'bytes', 'bus_time', 'sleep_time']
+
+
+def regressions(results, baseline, tolerance):
+
+    found = []
+
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+        for key in compared:
+            if result[key] > baseline[name][key] * (1 + tolerance) + 1e-9:
+                found.append('%s: %s %s > baseline %s' % (name, key, result[key], baseline[name][key]))
+
+    return found
+
+
+def main(argv = None):
+
+    parser = argparse.ArgumentParser(description = 'Benchmark the built-in routines on a simulated bus')
+    parser.add_argument('names', nargs = '*', help = 'routines to run, default all')
+    parser.add_argument('--speed', type = int, default = 100000, help = 'I2C clock in Hz')
+    parser.add_argument('--overhead', type = float, default = 0.0, help = 'seconds per transaction')
+    parser.add_argument('--tolerance', type = float, default = 0.0, help = 'allowed relative increase')
+    parser.add_argument('--baseline', default = baseline_path)
+    parser.add_argument('--update', action = 'store_true', help = 'write the results as the baseline')
+    args = parser.parse_args(argv)
+
+    results, mismatches = {}, []
+
+    print '%-36s %8s %8s %9s %9s %9s' % ('routine', 'trans', 'bytes', 'bus ms', 'cpu ms', 'sleep s')
+
+    for name, run in routines():
+        if args.names and name not in args.names and name.split('.')[-1] not in args.names:
+            continue
+        result = measure(run, args.speed, args.overhead)
+        results[name] = result
+        if measure(run, args.speed, args.overhead, broadcast = None)['registers'] != result['registers']:
+            mismatches.append(name)
+        print '%-36s %8d %8d %9.2f %9.2f %9.2f' % (name, result['transactions'], result['bytes'],
+                                                  result['bus_time'] * 1000, result['cpu_time'] * 1000,
+                                                  result['sleep_time'])
+
+    for name in mismatches:
+        print 'MISMATCH %s: the drivers end up with other registers without broadcast' % name
+
+    if mismatches:
+        return 1
+
+    if args.update:
+        with open(args.baseline, 'w') as f:
+            json.dump({'speed': args.speed, 'overhead': args.overhead,
+                       'routines': dict((name, dict((key, result[key]) for key in compared))
+                                        for name, result in results.items())},
+                      f, indent = 2, sort_keys = True)
+        print 'baseline written to', args.baseline
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    if (baseline['speed'], baseline['overhead']) != (args.speed, args.overhead):
+        print 'baseline was recorded at %d Hz, %g s overhead: not compared' % (baseline['speed'], baseline['overhead'])
+        return 0
+
+    found = regressions(results, baseline['routines'], args.tolerance)
+
+    for line in found:
+        print 'REGRESSION', line
+
+    return 1 if found else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
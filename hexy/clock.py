@@ -0,0 +1,27 @@
+""" monotonic(): seconds on a clock that never jumps backwards, for timestamps and deadlines.
+    time.monotonic on Python 3, CLOCK_MONOTONIC through librt on Python 2 / Linux,
+    time.time where neither is available. """
+
+try:
+    from time import monotonic
+
+except ImportError:
+
+    import ctypes
+    import ctypes.util
+
+    CLOCK_MONOTONIC = 1
+
+    class timespec(ctypes.Structure):
+        _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+    try:
+        clock_gettime = ctypes.CDLL(ctypes.util.find_library('rt') or 'librt.so.1').clock_gettime
+
+        def monotonic():
+            t = timespec()
+            clock_gettime(CLOCK_MONOTONIC, ctypes.byref(t))
+            return t.tv_sec + t.tv_nsec * 1e-9
+
+    except (OSError, AttributeError):
+        from time import time as monotonic
@@ -0,0 +1,148 @@
+#!/usr/bin/python
+
+import threading
+import time
+from array import array
+from i2c import Adafruit_I2C
+from ..clock import monotonic
+
+# ============================================================================
+# ADS1115 16-bit ADC in continuous-conversion mode
+# ============================================================================
+
+class ADS1115 :
+  # Registers/etc.
+  __CONVERSION         = 0x00
+  __CONFIG             = 0x01
+
+  # Config bits
+  __MODE_CONTINUOUS    = 0x0000
+  __COMP_DISABLE       = 0x0003
+
+  # Input multiplexer for differential inputs 0: 0-1, 1: 0-3, 2: 1-3, 3: 2-3
+  __MUX_DIFFERENTIAL   = [0x0000, 0x1000, 0x2000, 0x3000]
+
+  __GAIN = {2/3.0: 0x0000, 1: 0x0200, 2: 0x0400, 4: 0x0600, 8: 0x0800, 16: 0x0A00}
+
+  __DATA_RATE = {8: 0x0000, 16: 0x0020, 32: 0x0040, 64: 0x0060,
+                 128: 0x0080, 250: 0x00A0, 475: 0x00C0, 860: 0x00E0}
+
+  def __init__(self, address=0x48, debug=False, bus=None):
+    self.i2c = Adafruit_I2C(address, bus=bus)
+    self.i2c.debug = debug
+    self.address = address
+    self.debug = debug
+    self.data_rate = None
+
+  def startContinuous(self, differential=0, gain=1, data_rate=860):
+    "Starts converting a differential input back to back at data_rate samples per second"
+    if gain not in self.__GAIN:
+      raise ValueError("Gain must be one of %s" % sorted(self.__GAIN))
+    if data_rate not in self.__DATA_RATE:
+      raise ValueError("Data rate must be one of %s" % sorted(self.__DATA_RATE))
+    config = (self.__MUX_DIFFERENTIAL[differential] | self.__GAIN[gain] | self.__MODE_CONTINUOUS |
+              self.__DATA_RATE[data_rate] | self.__COMP_DISABLE)
+    if (self.debug):
+      print "Starting continuous conversion, config 0x%04X" % config
+    self.i2c.writeList(self.__CONFIG, [config >> 8, config & 0xFF])
+    self.data_rate = data_rate
+    time.sleep(2.0 / data_rate)                   # let the first conversion complete
+
+  def readConversion(self):
+    "Reads the latest conversion as a signed 16-bit value"
+    result = self.i2c.readList(self.__CONVERSION, 2)
+    if result == -1:
+      raise IOError("Error reading the ADS1115 at 0x%02X" % self.address)
+    value = result[0] << 8 | result[1]
+    return value - 65536 if value > 32767 else value
+
+
+class ADCStream(object):
+  """Reads an ADS1115 in continuous mode at its data rate on a background thread
+  into a fixed-size ring of timestamps and values, preallocated as arrays.
+
+  overruns counts samples overwritten before any read got to them, by latest(),
+  window() or drain(), which all read up to the newest sample. missed counts
+  conversions the reader fell too far behind to read."""
+
+  def __init__(self, adc, differential=0, gain=1, data_rate=860, size=8192):
+    self.adc = adc
+    self.differential, self.gain, self.data_rate = differential, gain, data_rate
+    self.period = 1.0 / data_rate
+    self.size = size
+    self.values = array('h', [0]) * size
+    self.times = array('d', [0]) * size
+    self.count = 0                                # samples ever written
+    self.drained = 0                              # count at the last drain()
+    self.read = 0                                 # count at the last read of any kind
+    self.overruns = 0
+    self.missed = 0
+    self.error = None
+    self.stopping = threading.Event()
+    self.thread = None
+
+  def start(self):
+    self.adc.startContinuous(self.differential, self.gain, self.data_rate)
+    self.stopping.clear()
+    self.thread = threading.Thread(target=self.run, name='adc')
+    self.thread.daemon = True
+    self.thread.start()
+
+  def stop(self):
+    self.stopping.set()
+    if self.thread is not None and self.thread is not threading.current_thread():
+      self.thread.join()
+
+  def run(self):
+    deadline = monotonic()
+    try:
+      while not self.stopping.is_set():
+        value = self.adc.readConversion()
+        now = monotonic()
+        i = self.count % self.size
+        if self.count - self.read >= self.size:
+          self.overruns += 1
+        self.values[i], self.times[i] = value, now
+        self.count += 1
+        deadline += self.period
+        if now - deadline > self.period:
+          skipped = int((now - deadline) / self.period)
+          self.missed += skipped
+          deadline += skipped * self.period
+        if deadline > now:
+          time.sleep(deadline - now)
+    except Exception as error:
+      self.error = error
+
+  def __len__(self):
+    return min(self.count, self.size)
+
+  def latest(self):
+    "The newest (timestamp, value), None before the first sample"
+    count = self.count
+    if not count:
+      return None
+    self.read = count
+    i = (count - 1) % self.size
+    return self.times[i], self.values[i]
+
+  def __last(self, ring, count, n):
+    "The last n entries of ring up to count, oldest first, as an array slice"
+    end = count % self.size
+    start = end - n
+    if start >= 0:
+      return ring[start:end]
+    return ring[start:] + ring[:end]
+
+  def window(self, n):
+    "The newest n values (fewer until the ring has them) as an array, oldest first"
+    count = self.count
+    self.read = count
+    return self.__last(self.values, count, min(n, count, self.size))
+
+  def drain(self):
+    "(timestamps, values) arrays of the samples since the last drain()"
+    count = self.count
+    n = min(count - self.drained, self.size)
+    self.drained = self.read = count
+    return self.__last(self.times, count, n), self.__last(self.values, count, n)
@@ -0,0 +1,233 @@
+#!/usr/bin/python
+import errno
+import threading
+import time
+
+# ===========================================================================
+# I2C bus backends
+#
+# Adafruit_I2C(bus=...) takes any object with the subset of smbus.SMBus it
+# uses, smbus.SMBus itself being the hardware backend:
+#
+#   write_byte(addr, value)
+#   write_byte_data(addr, reg, value)
+#   write_word_data(addr, reg, value)
+#   write_i2c_block_data(addr, reg, data)
+#   read_byte_data(addr, reg)
+#   read_word_data(addr, reg)
+#   read_i2c_block_data(addr, reg, length=32)
+#
+# and optionally, for writes longer than a block (see Adafruit_I2C.writeLong):
+#
+#   write_i2c_data(addr, reg, data)     reg and data in one transaction
+#
+# Reads return the value or list of bytes, failures raise IOError
+# ===========================================================================
+
+class SimulatedBus(object):
+  """An in-process bus of simulated devices that counts transactions and
+  bytes on the wire and models the time they take at the given bus speed"""
+
+  def __init__(self, devices=None, speed=100000, overhead=0.0, realtime=False):
+    self.devices = dict(devices or {})            # address : device
+    self.speed = speed                            # SCL in Hz, 100000 or 400000
+    self.overhead = overhead                      # seconds of driver/syscall cost per transaction
+    self.realtime = realtime                      # sleep for the modelled time of each transaction
+    self.lock = threading.Lock()
+    self.log = None                               # set to a list to record every transaction
+    self.reset()
+
+  def reset(self):
+    "Clears the transaction, byte and time counters"
+    self.transactions = 0
+    self.bytes = 0
+    self.time = 0.0
+
+  def attach(self, address, device):
+    self.devices[address] = device
+    return device
+
+  def device(self, addr):
+    if addr in self.devices:
+      return self.devices[addr]
+    answering = [device for device in self.devices.values()
+                 if hasattr(device, 'answers') and device.answers(addr)]
+    if not answering:
+      raise IOError(errno.EREMOTEIO, "No device at 0x%02X" % addr)
+    return SimulatedBroadcast(answering)
+
+  def transfer(self, addr, kind, reg, written, read=0):
+    """Accounts for one transaction: the address byte, `written` bytes
+    (register pointer included) and, for reads, a repeated start, the
+    address byte again and `read` bytes. Every byte is 9 clocks with ACK"""
+    nbytes = 1 + written + (1 + read if read else 0)
+    clocks = 9*nbytes + (3 if read else 2)        # START, (repeated START), STOP
+    seconds = clocks / float(self.speed) + self.overhead
+    self.transactions += 1
+    self.bytes += nbytes
+    self.time += seconds
+    if self.log is not None:
+      self.log.append((addr, kind, reg, written + read))
+    if self.realtime:
+      time.sleep(seconds)
+
+  def write_byte(self, addr, value):
+    with self.lock:
+      self.device(addr).write(value, [])
+      self.transfer(addr, 'write', value, 1)
+
+  def write_byte_data(self, addr, reg, value):
+    with self.lock:
+      self.device(addr).write(reg, [value & 0xFF])
+      self.transfer(addr, 'write', reg, 2)
+
+  def write_word_data(self, addr, reg, value):
+    with self.lock:
+      self.device(addr).write(reg, [value & 0xFF, (value >> 8) & 0xFF])
+      self.transfer(addr, 'write', reg, 3)
+
+  def write_i2c_block_data(self, addr, reg, data):
+    if not 0 < len(data) <= 32:
+      raise OverflowError("Block writes carry 1 to 32 bytes, got %d" % len(data))
+    with self.lock:
+      self.device(addr).write(reg, [value & 0xFF for value in data])
+      self.transfer(addr, 'write', reg, 1 + len(data))
+
+  def write_i2c_data(self, addr, reg, data):
+    with self.lock:
+      self.device(addr).write(reg, [value & 0xFF for value in data])
+      self.transfer(addr, 'write', reg, 1 + len(data))
+
+  def read_byte_data(self, addr, reg):
+    with self.lock:
+      result = self.device(addr).read(reg, 1)
+      self.transfer(addr, 'read', reg, 1, 1)
+      return result[0]
+
+  def read_word_data(self, addr, reg):
+    with self.lock:
+      lo, hi = self.device(addr).read(reg, 2)
+      self.transfer(addr, 'read', reg, 1, 2)
+      return lo | (hi << 8)
+
+  def read_i2c_block_data(self, addr, reg, length=32):
+    if not 0 < length <= 32:
+      raise OverflowError("Block reads carry 1 to 32 bytes, got %d" % length)
+    with self.lock:
+      result = self.device(addr).read(reg, length)
+      self.transfer(addr, 'read', reg, 1, length)
+      return result
+
+
+# ===========================================================================
+# Simulated devices
+# ===========================================================================
+
+class SimulatedBroadcast(object):
+  "The devices answering a shared address, e.g. the PCA9685 ALLCALL address, take every write"
+
+  def __init__(self, devices):
+    self.devices = devices
+
+  def write(self, reg, data):
+    for device in self.devices:
+      device.write(reg, data)
+
+  def read(self, reg, length):
+    raise IOError(errno.EREMOTEIO, "Shared addresses cannot be read")
+
+
+class SimulatedPCA9685(object):
+  "Register model of a PCA9685, including MODE1 auto-increment, ALL_LED writes and ALLCALL/sub-addresses"
+
+  __MODE1              = 0x00
+  __SUBADR1            = 0x02
+  __ALLCALLADR         = 0x05
+  __LED0_ON_L          = 0x06
+  __ALL_LED_ON_L       = 0xFA
+  __PRESCALE           = 0xFE
+
+  __AI                 = 0x20
+  __SLEEP              = 0x10
+  __SUB1               = 0x08
+  __ALLCALL            = 0x01
+
+  def __init__(self):
+    self.registers = [0] * 256
+    self.registers[self.__MODE1] = 0x11           # power-on: SLEEP | ALLCALL
+    self.registers[0x01] = 0x04                   # MODE2: OUTDRV
+    self.registers[0x02:0x06] = [0xE2, 0xE4, 0xE8, 0xE0]  # SUBADR1-3, ALLCALLADR (8-bit)
+    self.registers[self.__PRESCALE] = 0x1E        # 200 Hz
+
+  def answers(self, addr):
+    "Whether the chip responds to addr as an enabled sub-address or its ALLCALL address"
+    mode1 = self.registers[self.__MODE1]
+    if mode1 & self.__ALLCALL and self.registers[self.__ALLCALLADR] >> 1 == addr:
+      return True
+    for i in xrange(3):
+      if mode1 & (self.__SUB1 >> i) and self.registers[self.__SUBADR1 + i] >> 1 == addr:
+        return True
+    return False
+
+  def __next(self, reg):
+    if not self.registers[self.__MODE1] & self.__AI:
+      return reg
+    if reg == 0x45:                               # LED15_OFF_H rolls over to MODE1
+      return 0x00
+    return reg + 1
+
+  def write(self, reg, data):
+    for value in data:
+      if reg == self.__PRESCALE and not self.registers[self.__MODE1] & self.__SLEEP:
+        pass                                      # PRE_SCALE is only writable while asleep
+      elif self.__ALL_LED_ON_L <= reg < self.__ALL_LED_ON_L + 4:
+        for channel in xrange(16):
+          self.registers[self.__LED0_ON_L + 4*channel + reg - self.__ALL_LED_ON_L] = value
+      else:
+        self.registers[reg] = value
+      reg = self.__next(reg)
+
+  def read(self, reg, length):
+    result = []
+    for i in xrange(length):
+      result.append(self.registers[reg])
+      reg = self.__next(reg)
+    return result
+
+  def pulse(self, channel):
+    "Returns the off count of a channel, 0 if it is fully off or not driven"
+    on_l, on_h, off_l, off_h = self.registers[self.__LED0_ON_L + 4*channel:self.__LED0_ON_L + 4*channel + 4]
+    if off_h & 0x10:
+      return 0
+    return ((off_h & 0x0F) << 8 | off_l) - ((on_h & 0x0F) << 8 | on_l)
+
+
+class SimulatedADS1115(object):
+  "Register model of an ADS1115 whose conversion register reads from source()"
+
+  __CONVERSION         = 0x00
+
+  def __init__(self, source=None):
+    self.source = source or (lambda: 0)           # returns the next signed 16-bit reading
+    self.registers = [0x0000, 0x8583, 0x8000, 0x7FFF]
+    self.pointer = 0
+
+  def write(self, reg, data):
+    self.pointer = reg & 0x03
+    if len(data) == 2:
+      self.registers[self.pointer] = data[0] << 8 | data[1]   # registers are big endian
+
+  def read(self, reg, length):
+    self.pointer = reg & 0x03
+    if self.pointer == self.__CONVERSION:
+      self.registers[self.__CONVERSION] = int(self.source()) & 0xFFFF
+    value = self.registers[self.pointer]
+    return ([value >> 8, value & 0xFF] * length)[:length]
+
+
+def simulated_bus(speed=100000, overhead=0.0, realtime=False, adc_source=None):
+  "A SimulatedBus with the plantoid's devices: PCA9685s at 0x40 and 0x41, an ADS1115 at 0x48"
+  return SimulatedBus({0x40: SimulatedPCA9685(),
+                       0x41: SimulatedPCA9685(),
+                       0x48: SimulatedADS1115(adc_source)},
+                      speed, overhead, realtime)
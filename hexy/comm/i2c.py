@@ -1,6 +1,7 @@
 #!/usr/bin/python
+import fcntl
+import os
 import re
-import smbus
 
 # ===========================================================================
 # Adafruit_I2C Class
@@ -8,6 +9,9 @@ import smbus
 
 class Adafruit_I2C(object):
 
+  __busNumber = None
+  __I2C_SLAVE = 0x0703                            # ioctl selecting the address of /dev/i2c# writes
+
   @staticmethod
   def getPiRevision():
     "Gets the version number of the Raspberry Pi board"
@@ -31,17 +35,39 @@ class Adafruit_I2C(object):
 
   @staticmethod
   def getPiI2CBusNumber():
-    # Gets the I2C bus number /dev/i2c#
-    return 1 if Adafruit_I2C.getPiRevision() > 1 else 0
+    # Gets the I2C bus number /dev/i2c#, /proc/cpuinfo is only parsed once per process
+    if Adafruit_I2C.__busNumber is None:
+      Adafruit_I2C.__busNumber = 1 if Adafruit_I2C.getPiRevision() > 1 else 0
+    return Adafruit_I2C.__busNumber
 
-  def __init__(self, address, busnum=-1, debug=False):
+  def __init__(self, address, busnum=-1, debug=False, bus=None):
     self.address = address
+    self.debug = debug
+    self.device = None                            # /dev/i2c# file descriptor, see writeLong()
+    # Any other backend, e.g. hexy.comm.bus.SimulatedBus, can be passed as bus
+    if bus is not None:
+      self.bus = bus
+      self.busnum = None
+      return
+    import smbus                                  # only needed once a device is opened
     # By default, the correct I2C bus is auto-detected using /proc/cpuinfo
     # Alternatively, you can hard-code the bus version below:
     # self.bus = smbus.SMBus(0); # Force I2C0 (early 256MB Pi's)
     # self.bus = smbus.SMBus(1); # Force I2C1 (512MB Pi's)
-    self.bus = smbus.SMBus(busnum if busnum >= 0 else Adafruit_I2C.getPiI2CBusNumber())
-    self.debug = debug
+    self.busnum = busnum if busnum >= 0 else Adafruit_I2C.getPiI2CBusNumber()
+    self.bus = smbus.SMBus(self.busnum)
+
+  def sameBus(self, other):
+    "Whether other is on this bus: the same /dev/i2c# or the same backend object"
+    if self.busnum is not None or other.busnum is not None:
+      return self.busnum == other.busnum
+    return self.bus is other.bus
+
+  def sibling(self, address):
+    "An Adafruit_I2C for another address on this bus"
+    if self.busnum is not None:
+      return Adafruit_I2C(address, busnum=self.busnum)
+    return Adafruit_I2C(address, bus=self.bus)
 
   def reverseByteOrder(self, data):
     "Reverses the byte order of an int (16-bit) or long (32-bit) value"
@@ -95,6 +121,27 @@ class Adafruit_I2C(object):
     except IOError, err:
       return self.errMsg()
 
+  def writeLong(self, reg, list):
+    """Writes an array of bytes of any length in one transaction, where SMBus block
+    writes stop at 32 bytes. Backends without write_i2c_data (see hexy.comm.bus) get
+    32 byte block writes instead, for registers that auto-increment"""
+    try:
+      if self.debug:
+        print "I2C: Writing list to register 0x%02X in one transaction:" % reg
+        print list
+      if self.busnum is not None:
+        if self.device is None:
+          self.device = os.open('/dev/i2c-%d' % self.busnum, os.O_RDWR)
+          fcntl.ioctl(self.device, self.__I2C_SLAVE, self.address)
+        os.write(self.device, str(bytearray([reg] + list)))
+      elif hasattr(self.bus, 'write_i2c_data'):
+        self.bus.write_i2c_data(self.address, reg, list)
+      else:
+        for i in xrange(0, len(list), 32):
+          self.bus.write_i2c_block_data(self.address, reg + i, list[i:i+32])
+    except (IOError, OSError), err:
+      return self.errMsg()
+
   def readList(self, reg, length):
     "Read a list of bytes from the I2C device"
     try:
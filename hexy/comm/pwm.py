@@ -27,28 +27,40 @@ class PWM :
 
   # Bits
   __RESTART            = 0x80
+  __AI                 = 0x20
   __SLEEP              = 0x10
   __ALLCALL            = 0x01
   __INVRT              = 0x10
   __OUTDRV             = 0x04
+  __FULL_OFF           = 0x1000                 # bit 4 of LEDn_OFF_H
 
-  general_call_i2c = Adafruit_I2C(0x00)
+  # SMBus block transfers carry at most 32 bytes, i.e. 8 channels
+  __MAX_BLOCK          = 32
+
+  general_call_i2c = None
 
   @classmethod
   def softwareReset(cls):
     "Sends a software reset (SWRST) command to all the servo drivers on the bus"
+    if cls.general_call_i2c is None:
+      cls.general_call_i2c = Adafruit_I2C(0x00)
     cls.general_call_i2c.writeRaw8(0x06)        # SWRST
 
-  def __init__(self, address=0x40, debug=False):
-    self.i2c = Adafruit_I2C(address)
+  def __init__(self, address=0x40, debug=False, bus=None, latch=True):
+    self.i2c = Adafruit_I2C(address, bus=bus)
     self.i2c.debug = debug
     self.address = address
     self.debug = debug
+    self.latch = latch                            # see blocks()
+    self.pending = None
+    self.shadow = [0] * 64                        # last written LEDn_ON_L..LEDn_OFF_H bytes
     if (self.debug):
       print "Reseting PCA9685 MODE1 (without SLEEP) and MODE2"
-    self.setAllPWM(0, 0)
+    # OCH stays clear, as after power-on: outputs change on the STOP of a transaction,
+    # so every channel written in one transaction switches at the same time, see latch
     self.i2c.write8(self.__MODE2, self.__OUTDRV)
-    self.i2c.write8(self.__MODE1, self.__ALLCALL)
+    self.i2c.write8(self.__MODE1, self.__ALLCALL | self.__AI)  # auto-increment for block writes
+    self.setAllPWM(0, 0)
     time.sleep(0.005)                                       # wait for oscillator
     
     mode1 = self.i2c.readU8(self.__MODE1)
@@ -78,24 +90,229 @@ class PWM :
     self.i2c.write8(self.__MODE1, oldmode | 0x80)
 
   def setPWM(self, channel, on, off):
-    "Sets a single PWM channel"
-    self.i2c.write8(self.__LED0_ON_L+4*channel, on & 0xFF)
-    self.i2c.write8(self.__LED0_ON_H+4*channel, on >> 8)
-    self.i2c.write8(self.__LED0_OFF_L+4*channel, off & 0xFF)
-    self.i2c.write8(self.__LED0_OFF_H+4*channel, off >> 8)
+    "Sets a single PWM channel, or buffers it until commit() while a frame is open"
+    if self.pending is not None:
+      self.pending[channel] = (on, off)
+      return
+    self.__writeChannels(channel, [on & 0xFF, on >> 8, off & 0xFF, off >> 8])
+
+  def setPWMRange(self, first_channel, pulses, on=0):
+    "Sets consecutive PWM channels starting at first_channel, one off value per channel"
+    if first_channel + len(pulses) > 16:
+      raise ValueError("Channels %d to %d do not exist" % (first_channel, first_channel + len(pulses) - 1))
+    data = []
+    for off in pulses:
+      data += [on & 0xFF, on >> 8, off & 0xFF, off >> 8]
+    self.__writeChannels(first_channel, data)
+
+  def __writeChannels(self, first_channel, data):
+    "Block writes the channels whose bytes differ from the shadow registers"
+    start = 4*first_channel
+    dirty = [i for i in xrange(start, start + len(data), 4)
+             if self.shadow[i:i+4] != data[i-start:i-start+4]]
+    while dirty:
+      # one block from the first dirty channel up to the last one that still fits,
+      # unchanged channels in between are rewritten rather than costing a transaction
+      i = dirty[0]
+      span = [j for j in dirty if j + 4 - i <= self.__MAX_BLOCK]
+      j = span[-1] + 4
+      dirty = dirty[len(span):]
+      if self.i2c.writeList(self.__LED0_ON_L + i, data[i-start:j-start]) != -1:
+        self.shadow[i:j] = data[i-start:j-start]
+
+  def begin(self):
+    "Starts buffering setPWM calls until commit()"
+    if self.pending is None:
+      self.pending = {}
+
+  def commit(self):
+    "Writes the buffered channels in block writes, see blocks()"
+    if not self.pending:
+      self.pending = None
+      return
+    target = self.target()
+    self.pending = None
+    self.writeBlocks(target, self.blocks(target))
+
+  def target(self):
+    "The LEDn registers as they will be once the buffered channels are written"
+    target = list(self.shadow)
+    for channel, (on, off) in (self.pending or {}).items():
+      target[4*channel:4*channel+4] = [on & 0xFF, on >> 8, off & 0xFF, off >> 8]
+    return target
+
+  def blocks(self, target, shadow=None):
+    """(first, last) channels of the writes that cover the channels target changes.
+    With latch, one write from the first to the last changed channel, rewriting the
+    unchanged ones in between, so that every channel of a frame switches on its STOP.
+    Without, consecutive changed channels share a block write of up to 8 channels,
+    which sends the fewest bytes but switches each block on its own"""
+    shadow = self.shadow if shadow is None else shadow
+    changed = [channel for channel in xrange(16)
+               if shadow[4*channel:4*channel+4] != target[4*channel:4*channel+4]]
+    if self.latch:
+      return [(changed[0], changed[-1])] if changed else []
+    blocks = []
+    for channel in changed:
+      if blocks and blocks[-1][1] == channel - 1 and 4*(channel - blocks[-1][0] + 1) <= self.__MAX_BLOCK:
+        blocks[-1] = (blocks[-1][0], channel)
+      else:
+        blocks.append((channel, channel))
+    return blocks
+
+  @staticmethod
+  def clocks(blocks):
+    "Bus clocks of writing blocks: address, register and 4 bytes per channel of 9 clocks, START and STOP"
+    return sum(9*(2 + 4*(last - first + 1)) + 2 for first, last in blocks)
+
+  def writeBlocks(self, target, blocks):
+    "Writes the target registers of the channels in blocks, each block in one transaction"
+    write = self.i2c.writeLong if self.latch else self.i2c.writeList
+    for first, last in blocks:
+      i, j = 4*first, 4*last + 4
+      if write(self.__LED0_ON_L + i, target[i:j]) != -1:
+        self.shadow[i:j] = target[i:j]
+
+  def writeRegisters(self, first_channel, data):
+    """Writes LEDn registers as they are, 4 bytes per channel from first_channel: in one
+    transaction with latch, else in block writes of up to 8 channels"""
+    if self.latch:
+      write, step = self.i2c.writeLong, len(data)
+    else:
+      write, step = self.i2c.writeList, self.__MAX_BLOCK
+    start = 4*first_channel
+    for i in xrange(0, len(data), step):
+      chunk = data[i:i+step]
+      if write(self.__LED0_ON_L + start + i, chunk) != -1:
+        self.shadow[start+i:start+i+len(chunk)] = chunk
 
   def setAllPWM(self, on, off):
     "Sets a all PWM channels"
-    self.i2c.write8(self.__ALL_LED_ON_L, on & 0xFF)
-    self.i2c.write8(self.__ALL_LED_ON_H, on >> 8)
-    self.i2c.write8(self.__ALL_LED_OFF_L, off & 0xFF)
-    self.i2c.write8(self.__ALL_LED_OFF_H, off >> 8)
+    if self.pending:
+      self.pending.clear()                        # superseded by the ALL_LED write
+    data = [on & 0xFF, on >> 8, off & 0xFF, off >> 8]
+    if self.i2c.writeList(self.__ALL_LED_ON_L, data) != -1:
+      self.shadow = data * 16
+
+  def allOff(self):
+    "Turns every channel fully off with one ALL_LED write, unless they already are"
+    if self.pending or self.shadow != [0, 0, 0, self.__FULL_OFF >> 8] * 16:
+      self.setAllPWM(0, self.__FULL_OFF)
+
+  def refresh(self):
+    "Reloads the shadow registers from the chip with block reads"
+    shadow = []
+    for i in xrange(0, 64, self.__MAX_BLOCK):
+      block = self.i2c.readList(self.__LED0_ON_L + i, self.__MAX_BLOCK)
+      if block == -1:
+        return -1
+      shadow += block
+    self.shadow = shadow
 
   def getPWM(self, channel):
+     "Returns the pulse length of a channel as last written, see refresh()"
      if channel > 15:
        return
 
-     on = self.i2c.readU8(self.__LED0_ON_L + 4*channel) + self.i2c.readU8(self.__LED0_ON_H + 4*channel)*256
-     off = self.i2c.readU8(self.__LED0_OFF_L + 4*channel) + self.i2c.readU8(self.__LED0_OFF_H + 4*channel)*256
+     on = self.shadow[4*channel] + self.shadow[4*channel + 1]*256
+     off = self.shadow[4*channel + 2] + self.shadow[4*channel + 3]*256
 
+     if off & self.__FULL_OFF:
+       return 0
      return off - on
+
+
+class PWMBroadcast :
+  """Commits the frames of several PCA9685s at once: channels that get the same new
+  value on every chip are block written once to an address all of them answer, by
+  default the ALLCALL address PWM enables, then each chip writes the rest itself.
+  All writes are worked out first and then sent back to back. The drivers must be on
+  one bus, the broadcast goes out on it. When every chip latches, a broadcast is only
+  sent if it leaves no rest, so that each chip's channels still switch together."""
+
+  # Registers/etc.
+  __LED0_ON_L          = 0x06
+
+  # SMBus block transfers carry at most 32 bytes, i.e. 8 channels
+  __MAX_CHANNELS       = 8
+
+  def __init__(self, drivers, address=0x70):
+    self.drivers = list(drivers)
+    if not PWMBroadcast.onOneBus(self.drivers):
+      raise ValueError("Cannot broadcast to drivers on different buses")
+    self.i2c = self.drivers[0].i2c.sibling(address)
+    self.address = address
+
+  @staticmethod
+  def onOneBus(drivers):
+    "Whether drivers are all on the same bus"
+    return all(driver.i2c.sameBus(drivers[0].i2c) for driver in drivers)
+
+  def commit(self):
+    "Writes the buffered channels of every driver and closes their frames"
+    targets = [driver.target() for driver in self.drivers]
+
+    def same(channel):
+      return all(target[4*channel:4*channel+4] == targets[0][4*channel:4*channel+4] for target in targets)
+
+    # channels changing to the same value on every chip
+    shared = [channel for channel in xrange(16) if same(channel) and
+              all(driver.shadow[4*channel:4*channel+4] != target[4*channel:4*channel+4]
+                  for driver, target in zip(self.drivers, targets))]
+
+    latch = all(driver.latch for driver in self.drivers)
+
+    shared_blocks = []
+    if latch and shared:
+      # as PWM.blocks, one write from the first shared channel to the last, as long as
+      # the channels in between are the same on every chip too
+      if all(same(channel) for channel in xrange(shared[0], shared[-1] + 1)):
+        shared_blocks.append((shared[0], shared[-1]))
+      shared = []
+
+    while shared:
+      # one block from the first shared channel up to the last one that still fits,
+      # as long as the channels in between are the same on every chip too
+      first = last = shared[0]
+      for channel in shared[1:]:
+        if channel - first >= self.__MAX_CHANNELS or channel != last + 1:
+          break
+        last = channel
+      shared = [channel for channel in shared if channel > last]
+      shared_blocks.append((first, last))
+
+    alone = [driver.blocks(target) for driver, target in zip(self.drivers, targets)]
+
+    # each chip's blocks once the shared ones are written
+    rest = []
+    for driver, target in zip(self.drivers, targets):
+      shadow = list(driver.shadow)
+      for first, last in shared_blocks:
+        shadow[4*first:4*last+4] = target[4*first:4*last+4]
+      rest.append(driver.blocks(target, shadow))
+
+    # only broadcast when it saves bus time over each chip writing its own, and when
+    # latching, only when it is each chip's one write
+    if (not shared_blocks or (latch and any(rest)) or
+        PWM.clocks(shared_blocks) + sum(map(PWM.clocks, rest)) >= sum(map(PWM.clocks, alone))):
+      shared_blocks, rest = [], alone
+
+    for driver in self.drivers:
+      driver.pending = None
+
+    write = self.i2c.writeLong if latch else self.i2c.writeList
+    failed = False
+    for first, last in shared_blocks:
+      i, j = 4*first, 4*last + 4
+      if write(self.__LED0_ON_L + i, targets[0][i:j]) != -1:
+        for driver in self.drivers:
+          driver.shadow[i:j] = targets[0][i:j]
+      else:
+        failed = True
+
+    if failed:
+      # each chip writes whatever the broadcast did not
+      rest = [driver.blocks(target) for driver, target in zip(self.drivers, targets)]
+
+    for driver, target, blocks in zip(self.drivers, targets, rest):
+      driver.writeBlocks(target, blocks)
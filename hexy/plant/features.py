@@ -0,0 +1,84 @@
+import numpy as np
+
+
+default_bands = {'slow': (0.0, 1.0), 'mid': (1.0, 10.0), 'fast': (10.0, 100.0), 'mains': (45.0, 65.0)}
+
+
+class Features:
+    """ Windowed features of the newest window samples of a sensor stream such as
+        hexy.comm.ads1115.ADCStream, computed with NumPy over the whole window at once:
+
+        mean, median, variance      of the window
+        moving_mean, moving_median  of its newest block of samples
+        slope                       least-squares trend, in units per second
+        bands                       name : spectral power within (low, high) Hz
+
+        It is itself a sensor for hexy.plant.runtime.Runtime, whose latest() gives the
+        feature named key. There are no features until the stream filled a whole window
+        (at most the stream's size), they are only recomputed when new samples arrived. """
+
+    def __init__(self, stream, window = 1024, block = 86, key = 'moving_median', bands = None):
+
+        self.stream = stream
+        self.window, self.block, self.key = min(window, stream.size), block, key
+        self.bands = bands or default_bands
+
+        self.rate = float(stream.data_rate)
+        self.computed_at = None     # stream count the values are for
+        self.values = None
+
+        x = np.arange(self.window) / self.rate
+        self.offsets = x - x.mean()
+        self.taper = np.hanning(self.window)
+        self.frequencies = np.fft.rfftfreq(self.window, 1 / self.rate)
+
+    @property
+    def error(self):
+        return self.stream.error
+
+    def start(self):
+        self.stream.start()
+
+    def stop(self):
+        self.stream.stop()
+
+    def latest(self):
+        """ (timestamp, feature named key), None before the first whole window """
+
+        sample = self.stream.latest()
+        values = self.update()
+        if sample is None or values is None:
+            return None
+
+        return sample[0], values[self.key]
+
+    def update(self):
+        """ the features of the current window, None before the first whole window """
+
+        count = self.stream.count
+        if count == self.computed_at or count < self.window:
+            return self.values
+
+        y = np.frombuffer(self.stream.window(self.window), dtype = np.int16).astype(np.float64)
+        n = len(y)
+
+        mean = y.mean()
+        recent = y[-self.block:]
+        x = self.offsets
+
+        power = np.abs(np.fft.rfft((y - mean) * self.taper)) ** 2 / n
+        frequencies = self.frequencies
+
+        self.values = {
+            'mean': mean,
+            'median': np.median(y),
+            'variance': y.var(),
+            'moving_mean': recent.mean(),
+            'moving_median': np.median(recent),
+            'slope': np.dot(x, y) / np.dot(x, x) if n > 1 else 0.0,
+            'bands': dict((name, power[(frequencies >= low) & (frequencies < high)].sum())
+                          for name, (low, high) in self.bands.items()),
+        }
+        self.computed_at = count
+
+        return self.values
@@ -0,0 +1,122 @@
+from ..clock import monotonic
+from bisect import bisect_left
+from functools import partial
+from random import randint
+import json
+import os
+
+
+class Policy:
+    """ Selects a behavior for a reading by the threshold bands of a JSON file, which
+        is reloaded whenever it changes, without restarting:
+
+        {"scale": -1,               the reading is multiplied by scale before the lookup
+         "hysteresis": 0,           the last band is kept until the reading leaves it by more
+         "bands": [                 in ascending order, each one covering (previous upto, upto]
+           {"upto": 4, "label": "Neutral stance", "routine": "do_neutral_stance", "rest": 5.0},
+           {"upto": 45, "routine": "rotate_cw", "args": {"r": 3}, "rest": [4, 150], "cooldown": 30},
+           {"upto": 1800, "routine": null},
+           ...]}
+
+        routine names a function of routines (name : function), called with args. null,
+        readings above the last band and routines within cooldown seconds of the last time
+        they were selected keep sampling. rest is seconds or [low, high] for a random
+        whole number of seconds. A file that fails to load keeps the previous policy. """
+
+    def __init__(self, path, routines, clock = monotonic):
+
+        self.path = path
+        self.routines = routines
+        self.clock = clock
+
+        self.mtime = None
+        self.current = None     # index of the last band looked up
+        self.selected = {}      # routine name : time it was last selected
+
+        self.load()
+
+    def load(self):
+        """ reads the file, raises IOError or ValueError if it is not a valid policy """
+
+        mtime = os.stat(self.path).st_mtime
+
+        with open(self.path) as f:
+            config = json.load(f)
+
+        bands = config['bands'] if 'bands' in config else []
+        bounds = [band.get('upto') for band in bands]
+
+        if not bands:
+            raise ValueError("%s has no bands" % self.path)
+        if not all(isinstance(bound, (int, float)) for bound in bounds):
+            raise ValueError("Every band of %s needs a numeric upto" % self.path)
+        if any(low >= high for low, high in zip(bounds, bounds[1:])):
+            raise ValueError("The bands of %s are not in ascending order" % self.path)
+
+        for band in bands:
+            if band.get('routine') is not None and band['routine'] not in self.routines:
+                raise ValueError("Unknown routine %s in %s" % (band['routine'], self.path))
+
+        self.scale = config.get('scale', 1)
+        self.hysteresis = config.get('hysteresis', 0)
+        self.bands, self.bounds = bands, bounds
+        self.current = None
+        self.mtime = mtime
+
+    def reload(self):
+        """ loads the file again if it changed, returns whether it did """
+
+        try:
+            if os.stat(self.path).st_mtime == self.mtime:
+                return False
+            self.load()
+        except (IOError, OSError, ValueError, KeyError, TypeError, AttributeError) as error:
+            print "Keeping the previous policy:", error
+            self.mtime = os.stat(self.path).st_mtime if os.path.exists(self.path) else None
+            return False
+
+        print "Reloaded", self.path
+        return True
+
+    def band(self, value):
+        """ the index of the band of value, None above the last one """
+
+        x = value * self.scale
+        i = self.current
+
+        if i is not None:
+            low = self.bounds[i - 1] - self.hysteresis if i > 0 else float('-inf')
+            if low < x <= self.bounds[i] + self.hysteresis:
+                return i
+
+        i = bisect_left(self.bounds, x)
+        self.current = i if i < len(self.bounds) else None
+
+        return self.current
+
+    def select(self, value):
+        """ (routine, rest) for value, None to keep sampling """
+
+        self.reload()
+
+        i = self.band(value)
+        if i is None:
+            return None
+
+        band = self.bands[i]
+        name = band.get('routine')
+        if name is None:
+            return None
+
+        now = self.clock()
+        if name in self.selected and now - self.selected[name] < band.get('cooldown', 0):
+            return None
+        self.selected[name] = now
+
+        print band.get('label', name)
+
+        rest = band.get('rest', 0)
+        if isinstance(rest, list):
+            rest = randint(*rest)
+
+        return partial(self.routines[name], **band.get('args', {})), rest
@@ -0,0 +1,130 @@
+from ..clock import monotonic
+from collections import deque
+import threading
+
+try:
+    from Queue import Queue, Empty
+except ImportError:
+    from queue import Queue, Empty
+
+
+class Sampler:
+    """ Calls read() back to back on its own thread and keeps the last history
+        (timestamp, value) samples. A sensor for Runtime, like hexy.comm.ads1115.ADCStream """
+
+    def __init__(self, read, history = 4096):
+
+        self.read = read
+        self.samples = deque(maxlen = history)
+        self.error = None
+        self.stopping = threading.Event()
+
+        self.thread = threading.Thread(target = self.run, name = 'sensor')
+        self.thread.daemon = True
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+
+    def run(self):
+
+        try:
+            while not self.stopping.is_set():
+                self.samples.append((monotonic(), self.read()))
+        except Exception as error:
+            self.error = error
+
+    def latest(self):
+        """ the newest (timestamp, value), None before the first sample """
+
+        try:
+            return self.samples[-1]
+        except IndexError:
+            return None
+
+
+class Runtime:
+    """ Runs sensing, behavior selection and motion as separate tasks so that the
+        plant signal is sampled the whole time the robot moves or rests.
+
+        sensor          samples on its own thread, see Sampler: start(), stop(),
+                        latest() and error
+        select(value)   returns (routine, rest) or None, called on the behavior thread
+                        with the latest value whenever the robot is idle; routine() is
+                        then run on the motion thread (the one calling run()) and
+                        nothing new is selected until rest seconds after it finished """
+
+    def __init__(self, sensor, select, poll = 0.1):
+
+        self.sensor, self.select = sensor, select
+        self.poll = poll
+
+        self.motions = Queue()
+        self.idle = threading.Event()
+        self.stopping = threading.Event()
+        self.error = None
+
+        self.thread = threading.Thread(target = self.behave, name = 'behavior')
+        self.thread.daemon = True
+
+    def latest(self):
+        return self.sensor.latest()
+
+    def behave(self):
+
+        try:
+            while not self.stopping.is_set():
+
+                sample = self.sensor.latest()
+                choice = self.select(sample[1]) if sample is not None else None
+
+                if choice is None:
+                    self.stopping.wait(self.poll)
+                    continue
+
+                routine, rest = choice
+
+                self.idle.clear()
+                self.motions.put(routine)
+                self.idle.wait()
+
+                self.stopping.wait(rest)
+
+        except Exception as error:
+            self.error = error
+            self.stop()
+
+    def run(self):
+        """ starts the sensor and behavior tasks and runs the motions they select
+            until stop() is called or a task fails, whose error is then re-raised """
+
+        self.sensor.start()
+        self.thread.start()
+
+        try:
+            while not self.stopping.is_set():
+
+                if self.sensor.error is not None:
+                    self.error = self.sensor.error
+                    break
+
+                try:
+                    routine = self.motions.get(timeout = self.poll)
+                except Empty:
+                    continue
+                try:
+                    routine()
+                finally:
+                    self.idle.set()
+        finally:
+            self.stop()
+
+        if self.error is not None:
+            raise self.error
+
+    def stop(self):
+        self.stopping.set()
+        self.idle.set()
+        self.sensor.stop()
@@ -0,0 +1,63 @@
+import numpy as np
+
+
+class BodyState:
+    """ The joints of a robot as columns indexed like core.joint_keys:
+
+        min, max    angle limits in degrees
+        table       the pulse of every whole degree, table[j, angle - min[j]]
+
+        so the angles of a whole-body pose are constrained and remapped to pulses with
+        one array operation each. The columns are copies of the joints' fixed settings,
+        taken when the BodyState is built. It is not the joints' state: each joint keeps
+        its own angle and pulse as plain attributes, which per-joint poses reach fastest,
+        and snapshot() copies them out. """
+
+    degrees = 181       # the widest range a joint can have, -90 to 90
+
+    def __init__(self, joints):
+
+        self.joints = sorted(joints, key = lambda joint: joint.index)
+        size = len(self.joints)
+
+        self.min = np.array([joint.min for joint in self.joints], dtype = np.int32)
+        self.max = np.array([joint.max for joint in self.joints], dtype = np.int32)
+        self.table = np.zeros((size, self.degrees), dtype = np.uint16)
+
+        for row, joint in enumerate(self.joints):
+            self.table[row, :len(joint.pulses)] = joint.pulses
+
+        self.rows = np.arange(size)
+
+    def __len__(self):
+        return len(self.joints)
+
+    def constrain(self, angles):
+        return np.clip(angles, self.min, self.max)
+
+    def remap(self, angles, rows = None):
+        """ the pulses of angles within limits, for the joints in rows if given """
+
+        rows = self.rows if rows is None else rows
+        whole = np.where(angles >= 0, np.floor(angles + 0.5), np.ceil(angles - 0.5)).astype(np.int32)
+        return self.table[rows, whole - self.min[rows]]
+
+    def resolve(self, angles):
+        """ (rows, angles, pulses) lists of the joints angles poses, one angle per joint
+            in joint_keys order, None or nan for a joint to leave out """
+
+        angles = np.array([np.nan if angle is None else angle for angle in angles], dtype = np.float64)
+
+        rows = np.flatnonzero(~np.isnan(angles))
+        angles = self.constrain(angles)[rows]
+
+        return rows.tolist(), angles.tolist(), self.remap(angles, rows).tolist()
+
+    def snapshot(self):
+        """ (angles, pulses) arrays copied from the joints, angle nan while off, e.g. to
+            log, diff or send. Built in Python from the joints on every call """
+
+        angles = np.array([np.nan if joint.angle is None else joint.angle for joint in self.joints])
+        pulses = np.array([joint.pulse for joint in self.joints], dtype = np.uint16)
+
+        return angles, pulses
@@ -0,0 +1,226 @@
+from .core import joint_keys, joint_properties, joint_addresses
+import mmap
+import struct
+
+""" Motion clip file format, little-endian:
+
+    header      magic 'HXCL', version, driver count, channels per driver, joint count,
+                frame count, duration in microseconds
+    drivers     the I2C address of each driver, one byte each
+    joints      name, index of its driver, channel and the angle the clip ends on (nan if off)
+    index       start time in microseconds and file offset of every frame
+    frames      the deltas of hexy.robot.gait.deltas(): the number of changes and writes,
+                each change as joint index, pulse and angle (nan if off), each write as
+                position of its driver, first channel, channel count and the LEDn registers
+                of those channels as they are written """
+
+MAGIC = b'HXCL'
+VERSION = 2
+
+HEADER = struct.Struct('<4sHBBHIQ')
+JOINT = struct.Struct('<4sBBf')
+INDEX = struct.Struct('<QQ')
+COUNTS = struct.Struct('<BB')
+CHANGE = struct.Struct('<BHf')
+WRITE = struct.Struct('<BBB')
+
+
+def save(gait, path):
+    """ writes a hexy.robot.gait.Gait to path as a clip """
+
+    addresses = list(gait.addresses)
+
+    with open(path, 'wb') as f:
+
+        f.write(HEADER.pack(MAGIC, VERSION, len(addresses), gait.channels, len(joint_keys),
+                            len(gait), int(round(gait.duration * 1e6))))
+        f.write(struct.pack('<%dB' % len(addresses), *addresses))
+
+        for i, key in enumerate(joint_keys):
+            f.write(JOINT.pack(key.encode('ascii'), addresses.index(joint_addresses[key]),
+                               joint_properties[key][0], gait.angles[i]))
+
+        records = []
+        for changes, writes in gait.deltas:
+            record = [COUNTS.pack(len(changes), len(writes))]
+            for index, angle, pulse in changes:
+                record.append(CHANGE.pack(index, pulse, float('nan') if angle is None else angle))
+            for position, first, data in writes:
+                record.append(WRITE.pack(position, first, len(data) // 4) + bytes(bytearray(data)))
+            records.append(b''.join(record))
+
+        offset = f.tell() + len(records) * INDEX.size
+        time = 0.0
+        for record, delay in zip(records, gait.delays):
+            f.write(INDEX.pack(int(round(time * 1e6)), offset))
+            offset += len(record)
+            time += delay
+
+        for record in records:
+            f.write(record)
+
+
+class Clip:
+    """ A clip file memory-mapped for playback. The deltas of each frame are read
+        straight from the map as they are played and written as they are, so a clip of
+        any length loads at once and only the pages being played are resident.
+
+        with Clip('thriller.clip') as clip:
+            clip.play(hexy) """
+
+    def __init__(self, path):
+
+        self.file = open(path, 'rb')
+
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access = mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise ValueError("%s is empty" % path)
+
+        try:
+            self.load(path)
+        except struct.error:
+            self.close()
+            raise ValueError("%s is truncated" % path)
+        except ValueError:
+            self.close()
+            raise
+
+    def load(self, path):
+
+        (magic, version, drivers, self.channels, joints,
+         self.frames, duration) = HEADER.unpack_from(self.map, 0)
+
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("%s is not a version %d motion clip" % (path, VERSION))
+
+        self.duration = duration / 1e6
+
+        offset = HEADER.size
+        self.addresses = list(struct.unpack_from('<%dB' % drivers, self.map, offset))
+        offset += drivers
+
+        self.angles = {}
+
+        for _ in xrange(joints):
+            name, driver, channel, angle = JOINT.unpack_from(self.map, offset)
+            offset += JOINT.size
+
+            key = name.rstrip(b'\0').decode('ascii', 'replace')
+            if key not in joint_properties:
+                raise ValueError("%s has a joint %s that hexy.robot.core does not" % (path, key))
+            if (driver >= drivers or joint_addresses[key] != self.addresses[driver] or
+                    joint_properties[key][0] != channel):
+                raise ValueError("%s routes joint %s differently than hexy.robot.core" % (path, key))
+
+            self.angles[key] = None if angle != angle else angle
+
+        self.index = offset
+        self.changes = {}       # number of changes : their struct.Struct, see delta()
+
+        if self.index + self.frames * INDEX.size > len(self.map):
+            raise ValueError("%s is truncated" % path)
+
+        if self.frames and self.delta(self.at(self.frames - 1)[1])[2] > len(self.map):
+            raise ValueError("%s is truncated" % path)
+
+    def __len__(self):
+        return self.frames
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def at(self, i):
+        """ (start time in seconds, file offset) of frame i """
+
+        time, offset = INDEX.unpack_from(self.map, self.index + i * INDEX.size)
+        return time / 1e6, offset
+
+    def delta(self, offset):
+        """ (changes, writes, end offset) of the frame at offset, see gait.deltas() """
+
+        m = self.map
+        n, w = COUNTS.unpack_from(m, offset)
+        offset += COUNTS.size
+
+        if n not in self.changes:
+            self.changes[n] = struct.Struct('<' + CHANGE.format[1:] * n)
+        values = self.changes[n].unpack_from(m, offset)
+        offset += self.changes[n].size
+
+        changes = []
+        for k in xrange(0, 3 * n, 3):
+            index, pulse, angle = values[k : k + 3]
+            changes.append((index, None, 0) if angle != angle else (index, angle, pulse))
+
+        writes = []
+        for _ in xrange(w):
+            position, first, count = WRITE.unpack_from(m, offset)
+            offset += WRITE.size
+            writes.append((position, first, list(bytearray(m[offset : offset + 4 * count]))))
+            offset += 4 * count
+
+        return changes, writes, offset
+
+    def play(self, robot, repeat = 1, speed = 1.0):
+        """ poses every frame on robot at its start time, divided by speed, on absolute
+            deadlines of robot's control loop, or as fast as possible if speed is 0 or
+            None. See gait.Playback """
+
+        from .gait import Playback
+
+        playback = Playback(robot, self.addresses)
+        control = robot.control
+
+        start = control.clock()
+        last = self.at(self.frames - 1)[0] if self.frames else 0.0
+
+        for r in xrange(repeat):
+            for i in xrange(self.frames):
+                t, offset = self.at(i)
+
+                if speed and (r or i):
+                    control.wait_until(start + (r * self.duration + t) / speed)
+
+                changes, writes, _ = self.delta(offset)
+                playback(changes, writes)
+
+        if speed and self.duration > last:
+            control.wait_until(start + repeat * self.duration / speed)
+
+
+def main():
+
+    import argparse
+    from .gait import compile_routine
+
+    parser = argparse.ArgumentParser(description = "Records a routine on the simulated bus into a motion clip")
+    parser.add_argument('routine', help = "a DancingHexapod method, e.g. thriller, or plantoid.<function>")
+    parser.add_argument('path')
+    parser.add_argument('--prepare', default = 'lie_flat', help = "the DancingHexapod method to start from")
+    args = parser.parse_args()
+
+    def routine(robot):
+        if args.routine.startswith('plantoid.'):
+            import plantoid_version1 as plantoid
+            plantoid.setup(robot)
+            getattr(plantoid, args.routine.split('.', 1)[1])()
+        else:
+            getattr(robot, args.routine)()
+
+    gait = compile_routine(routine, prepare = lambda robot: getattr(robot, args.prepare)())
+    save(gait, args.path)
+
+    print "%s: %d frames, %.2f s" % (args.path, len(gait), gait.duration)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+from ..clock import monotonic
+import time
+
+
+class ControlLoop:
+    """ Paces motion on a monotonic clock with absolute deadlines, so the time spent
+        computing and writing frames is absorbed instead of adding up.
+
+        tick()      waits for the next of the fixed-rate ticks started by restart()
+        hold(t)     waits until t seconds after the last mark(), i.e. the last frame
+
+        Every wait records its slack (time left to sleep), overruns (deadline already
+        passed) and the jitter of the wake-up against the deadline in a histogram
+        whose bins are bounded by jitter_bins (seconds). """
+
+    jitter_bins = [0.0001, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02]
+
+    def __init__(self, rate = 50, clock = monotonic, sleep = None):
+
+        self.rate = rate
+        self.period = 1.0 / rate
+        self.clock = clock
+        self.sleep = sleep or time.sleep
+
+        self.deadline = None    # of the last tick
+        self.anchor = None      # of the last mark
+
+        self.reset()
+
+    def reset(self):
+        """ clears the statistics """
+
+        self.waits, self.overruns = 0, 0
+        self.slack, self.min_slack = 0.0, None
+        self.histogram = [0] * (len(self.jitter_bins) + 1)
+
+    def restart(self):
+        """ the next tick() is due now, the ones after it every period """
+        self.deadline = None
+
+    def tick(self):
+
+        if self.deadline is None:
+            self.deadline = self.clock()
+        else:
+            self.deadline += self.period
+
+        late = self.wait_until(self.deadline)
+
+        if late > self.period:
+            self.deadline += late   # skip the missed ticks instead of bursting through them
+
+    def mark(self):
+        self.anchor = self.clock()
+
+    def hold(self, seconds):
+
+        if seconds <= 0:
+            return
+
+        if self.anchor is None:
+            self.mark()
+
+        self.wait_until(self.anchor + seconds)
+        self.anchor = None
+
+    def wait_until(self, deadline):
+        """ sleeps until deadline and returns how late it woke up """
+
+        slack = deadline - self.clock()
+
+        self.waits += 1
+        self.min_slack = slack if self.min_slack is None else min(self.min_slack, slack)
+
+        if slack > 0:
+            self.slack += slack
+            self.sleep(slack)
+        else:
+            self.overruns += 1
+
+        late = self.clock() - deadline
+
+        for i, bound in enumerate(self.jitter_bins):
+            if late <= bound:
+                break
+        else:
+            i = len(self.jitter_bins)
+
+        self.histogram[i] += 1
+
+        return late
+
+    def report(self):
+
+        lines = ['waits %d, overruns %d, slack %.3f s, min slack %s' %
+                 (self.waits, self.overruns, self.slack,
+                  '-' if self.min_slack is None else '%.2f ms' % (self.min_slack * 1000))]
+
+        lower = 0.0
+        for bound, count in zip(self.jitter_bins + [None], self.histogram):
+            label = '> %.1f ms' % (lower * 1000) if bound is None else '<= %.1f ms' % (bound * 1000)
+            lines.append('  jitter %-10s %d' % (label, count))
+            lower = bound
+
+        return '\n'.join(lines)
@@ -1,5 +1,8 @@
-from ..comm.pwm import PWM
-from time import sleep
+from ..comm.pwm import PWM, PWMBroadcast
+from .control import ControlLoop
+from .telemetry import Telemetry
+from .trajectory import Trajectory
+from contextlib import contextmanager
 
 """ joint_key convention:
     R - right, L - left
@@ -18,21 +21,84 @@ joint_properties = {
     'N': (9, 170, 620, 1)
 }
 
+# a joint's index in telemetry and other per-joint tables
+joint_keys = sorted(joint_properties)
+
 driver1_legs = ['RFH', 'RFK', 'RFA', 
                 'LFH', 'LFK', 'LFA', 
                 'LMH', 'LMK', 'LMA', 
                 'N']
 
-driver1 = PWM(0x41)
-driver2 = PWM(0x40)
+driver2_legs = ['RMH', 'RMK', 'RMA', 
+                'RBH', 'RBK', 'RBA', 
+                'LBH', 'LBK', 'LBA']
+
+driver1_address, driver2_address = 0x41, 0x40
+
+# unloaded servo speed in degrees per second, and the fraction of it lost to the load a
+# joint carries, for estimating how long a move takes. Uncalibrated, measure your servos
+joint_speed = 600
+joint_loads = {'hip': 0.1, 'knee': 0.2, 'ankle': 0.15, 'neck': 0.0}
+
+# joint_key : I2C address of its driver, every joint is routed to exactly one driver
+joint_addresses = {}
+
+for address, keys in [(driver1_address, driver1_legs), (driver2_address, driver2_legs)]:
+  for key in keys:
+    if key in joint_addresses:
+      raise ValueError("joint %s is assigned to more than one driver" % key)
+    joint_addresses[key] = address
+
+
+class Drivers:
+    """ I2C address : PWM, a driver is only created and set to 60 Hz on first use,
+        on bus if given (see hexy.comm.bus) else on the Pi's I2C bus.
+        Frames are committed to all drivers together, channels with the same new pulse
+        on every driver are written once to the broadcast address (None to not), on
+        the bus of the drivers. Drivers on different buses are not broadcast to.
+        latch is passed on to the drivers, see PWM.blocks(): by default every channel
+        of a frame switches at the same time on each driver """
+
+    def __init__(self, drivers = None, bus = None, broadcast = 0x70, latch = True):
+        self.by_address = dict(drivers or {})
+        self.bus = bus
+        self.broadcast = broadcast
+        self.latch = latch
+        self.group = None
+
+    def __getitem__(self, address):
+
+        if address not in self.by_address:
+            driver = PWM(address, bus = self.bus, latch = self.latch)
+            driver.setPWMFreq(60)
+            self.by_address[address] = driver
+
+        return self.by_address[address]
 
-driver1.setPWMFreq(60)
-driver2.setPWMFreq(60)
+    def __iter__(self):
+        return iter(self.by_address.values())
+
+    def commit(self):
+
+        drivers = list(self)
+
+        if self.broadcast is None or len(drivers) < 2 or not PWMBroadcast.onOneBus(drivers):
+            for driver in drivers:
+                driver.commit()
+            return
+
+        if self.group is None or len(self.group.drivers) != len(drivers):
+            self.group = PWMBroadcast(drivers, self.broadcast)
+
+        self.group.commit()
+
+
+# shared by every HexapodCore that is not given its own drivers
+default_drivers = Drivers()
 
 
 def drive(ch, name, pulse):
-  driver = driver1 if name in driver1_legs else driver2
-  driver.setPWM(ch, 0, pulse)
+  default_drivers[joint_addresses[name]].setPWM(ch, 0, pulse)
 
 
 def constrain(val, min_val, max_val):
@@ -46,18 +112,41 @@ def remap(old_val, (old_min, old_max), (new_min, new_max)):
                  
 class HexapodCore:
 
-    def __init__(self):
+    def __init__(self, drivers = None, bus = None, telemetry = None, control = None):
+        """ drivers: a Drivers or a dict of I2C address : PWM, defaults to the shared default_drivers
+            bus: a bus backend such as hexy.comm.bus.SimulatedBus for drivers created on first use
+            telemetry: a Telemetry that every joint records its poses into
+            control: the ControlLoop that paces glide() and hold() """
+
+        if drivers is None and bus is None:
+            drivers = default_drivers
+        elif not isinstance(drivers, Drivers):
+            drivers = Drivers(drivers, bus)
+
+        if telemetry is None:
+            telemetry = Telemetry(names = joint_keys)
+
+        self.drivers = drivers
+        self.telemetry = telemetry
+        self.control = control or ControlLoop()
 
-        self.neck = Joint("neck", 'N', 90, -90)
+        self.body_state = None  # see body
 
-        self.left_front = Leg('left front', 'LFH', 'LFK', 'LFA')
-        self.right_front = Leg('right front', 'RFH', 'RFK', 'RFA')
+        self.frame_depth = 0
+        self.motion = 0.0       # estimated seconds until the joints of the last frame arrive
+        self.joints = []
+        self.begin_frame()
 
-        self.left_middle = Leg('left middle', 'LMH', 'LMK', 'LMA')
-        self.right_middle = Leg('right middle', 'RMH', 'RMK', 'RMA')
+        self.neck = Joint("neck", 'N', 90, -90, drivers, telemetry)
+
+        self.left_front = Leg('left front', 'LFH', 'LFK', 'LFA', drivers, telemetry)
+        self.right_front = Leg('right front', 'RFH', 'RFK', 'RFA', drivers, telemetry)
+
+        self.left_middle = Leg('left middle', 'LMH', 'LMK', 'LMA', drivers, telemetry)
+        self.right_middle = Leg('right middle', 'RMH', 'RMK', 'RMA', drivers, telemetry)
         
-        self.left_back = Leg('left back', 'LBH', 'LBK', 'LBA')
-        self.right_back = Leg('right back', 'RBH', 'RBK', 'RBA')
+        self.left_back = Leg('left back', 'LBH', 'LBK', 'LBA', drivers, telemetry)
+        self.right_back = Leg('right back', 'RBH', 'RBK', 'RBA', drivers, telemetry)
 
         self.legs = [self.left_front, self.right_front,
                      self.left_middle, self.right_middle,
@@ -76,33 +165,161 @@ class HexapodCore:
             self.knees.append(leg.knee)
             self.ankles.append(leg.ankle)
 
+        self.joints = [self.neck] + self.hips + self.knees + self.ankles
+        self.by_index = sorted(self.joints, key = lambda joint: joint.index)
+
+        for part in self.legs + self.joints:
+            part.robot = self       # poses outside a frame get one of their own
+
+        self.commit()
+
+    def begin_frame(self):
+        """ joint poses are buffered per driver until the matching commit() """
+
+        if self.frame_depth == 0:
+            if self.telemetry.log is not None:
+                self.telemetry.log.begin()
+            for driver in self.drivers:
+                driver.begin()
+            self.start_angles = [joint.angle for joint in self.joints]
+
+        self.frame_depth += 1
+
+    def commit(self):
+        """ closes a frame, the outermost commit writes each driver in one burst and
+            returns the estimated seconds until its slowest joint arrives """
+
+        self.frame_depth -= 1
+
+        if self.frame_depth == 0:
+            if self.telemetry.log is not None:
+                self.telemetry.log.commit()
+            self.control.mark()
+            self.drivers.commit()
+
+            self.motion = max([joint.travel(start, joint.angle)
+                               for joint, start in zip(self.joints, self.start_angles)
+                               if joint.angle is not None and joint.angle != start] or [0.0])
+
+            return self.motion
+
+    @property
+    def body(self):
+        """ the BodyState of the joints, built on first use so that only the code
+            using it imports NumPy """
+
+        if self.body_state is None:
+            from .body import BodyState
+            self.body_state = BodyState(self.joints)
+
+        return self.body_state
+
+    def pose(self, angles):
+        """ poses every joint in one frame, angles in joint_keys order, None or nan leaves
+            a joint as it is. Constrained and remapped for the whole body at once,
+            returns the estimated seconds until the slowest joint arrives """
+
+        body = self.body
+        rows, angles, pulses = body.resolve(angles)
+
+        self.begin_frame()
+
+        for row, angle, pulse in zip(rows, angles, pulses):
+            joint = self.by_index[row]
+            joint.driver.setPWM(joint.channel, 0, pulse)
+            joint.angle, joint.pulse = angle, pulse
+
+            if self.telemetry is not None:
+                self.telemetry.record(row, angle, pulse)
+
+        return self.commit()
+
+    @contextmanager
+    def frame(self):
+        """ with hexy.frame(): ... poses every joint in the block at the same time """
+
+        self.begin_frame()
+        try:
+            yield
+        finally:
+            self.commit()
+
+    def hold(self, t = None):
+        """ waits until t seconds after the last frame was committed, the time spent
+            writing it and since counts towards t. Without t, until its joints arrived """
+
+        self.control.hold(self.motion if t is None else t)
+
+    def glide(self, targets, duration, profile = 'minimum_jerk'):
+        """ moves the joints in targets (joint : angle) there over duration seconds
+            instead of jumping, posing all of them in one frame every control loop tick """
+
+        self.control.restart()
+
+        for angles in Trajectory(targets, duration, profile).frames(self.control.rate):
+            self.control.tick()
+
+            with self.frame():
+                for joint, angle in angles:
+                    joint.pose(angle)
+
+    def replant(self, leg, raised, floor, offset, t = 0.1):
+        """ raises leg to knee angle raised, then puts it down at knee angle floor and
+            hip angle offset, holding each for t seconds """
+
+        with self.frame():
+            leg.move(raised)
+        self.hold(t)
+
+        with self.frame():
+            leg.move(floor, offset)
+        self.hold(t)
+
+    def play(self, keyframes, profile = 'minimum_jerk'):
+        """ glides through keyframes, a list of (targets, duration) """
+
+        for targets, duration in keyframes:
+            self.glide(targets, duration, profile)
+
     def off(self):
+        """ relaxes every servo with one ALL_LED write per driver """
 
-        self.neck.off()
-        
-        for leg in self.legs:
-            leg.off() 
+        with self.frame():
+            for driver in self.drivers:
+                driver.allOff()
+
+            for joint in self.joints:
+                joint.released()
 
 
 class Leg:
 
-    def __init__(self, name, hip_key, knee_key, ankle_key):
+    def __init__(self, name, hip_key, knee_key, ankle_key, drivers = default_drivers, telemetry = None):
 
         max_hip, max_knee, max_ankle = 30, 90, 90
         min_hip, min_knee, min_ankle = -30, -70, -45
+        knee_leeway = 10
         
-        self.hip = Joint("hip", hip_key, max_hip, min_hip)
-        self.knee = Joint("knee", knee_key, max_knee, min_knee)
-        self.ankle = Joint("ankle", ankle_key, max_ankle, min_ankle)
+        self.hip = Joint("hip", hip_key, max_hip, min_hip, drivers, telemetry)
+        self.knee = Joint("knee", knee_key, max_knee, min_knee, drivers, telemetry)
+        self.ankle = Joint("ankle", ankle_key, max_ankle, min_ankle, drivers, telemetry)
+
+        self.knee.leeway = knee_leeway
 
         self.name = name
         self.joints = [self.hip, self.knee, self.ankle]
+        self.robot = None
 
     def pose(self, hip_angle = 0, knee_angle = 0, ankle_angle = 0):
+        """ returns the estimated seconds until the slowest of the joints arrives """
+
+        robot = self.robot
+        if robot is not None and robot.frame_depth == 0:
+            robot.begin_frame()
+            self.pose(hip_angle, knee_angle, ankle_angle)
+            return robot.commit()
 
-        self.hip.pose(hip_angle)
-        self.knee.pose(knee_angle)
-        self.ankle.pose(ankle_angle)
+        return max(self.hip.pose(hip_angle), self.knee.pose(knee_angle), self.ankle.pose(ankle_angle))
 
     def move(self, knee_angle = None, hip_angle = None, offset = 100):
         """ knee_angle < 0 means thigh is raised, ankle's angle will be set to the specified 
@@ -111,15 +328,25 @@ class Leg:
         if knee_angle == None: knee_angle = self.knee.angle
         if hip_angle == None: hip_angle = self.hip.angle
 
-        self.pose(hip_angle, knee_angle, offset - knee_angle)
+        return self.pose(hip_angle, knee_angle, offset - knee_angle)
 
-    def replant(self, raised, floor, offset, t = 0.1):
+    def targets(self, hip_angle = None, knee_angle = None, ankle_angle = None):
+        """ joint : angle for HexapodCore.glide(), joints given None are left out """
+
+        return dict((joint, angle) for joint, angle in zip(self.joints, [hip_angle, knee_angle, ankle_angle])
+                    if angle is not None)
+
+    def move_targets(self, knee_angle = None, hip_angle = None, offset = 100):
+        """ the targets of move() for HexapodCore.glide() """
+
+        if knee_angle == None: knee_angle = self.knee.angle
+        if hip_angle == None: hip_angle = self.hip.angle
 
-        self.move(raised)
-        sleep(t)
+        return self.targets(hip_angle, knee_angle, offset - knee_angle)
 
-        self.move(floor, offset)
-        sleep(t)
+    def replant(self, raised, floor, offset, t = 0.1):
+        """ see HexapodCore.replant() """
+        self.robot.replant(self, raised, floor, offset, t)
 
     def off(self):
         for joint in self.joints:
@@ -131,27 +358,67 @@ class Leg:
 
 class Joint:
 
-    def __init__(self, joint_type, jkey, mx, mn):
+    def __init__(self, joint_type, jkey, mx, mn, drivers = default_drivers, telemetry = None):
 
         self.joint_type, self.name =  joint_type, jkey
+        self.index = joint_keys.index(jkey)
+        self.telemetry = telemetry
         self.channel, self.min_pulse, self.max_pulse, self.direction = joint_properties[jkey]
         self.min, self.max = mn, mx
+        self.speed = joint_speed * (1 - joint_loads[joint_type])
+
+        if jkey not in joint_addresses:
+            raise KeyError("joint %s is not assigned to a driver" % jkey)
+
+        self.driver = drivers[joint_addresses[jkey]]
+        self.robot = None
+
+        # pulses[angle - min] for every whole degree from min to max
+        self.pulses = [remap((angle * self.direction), (-90, 90), (self.min_pulse, self.max_pulse))
+                       for angle in xrange(self.min, self.max + 1)]
 
         self.off()
 
     def pose(self, angle = 0):
+        """ returns the estimated seconds until the joint arrives """
+
+        robot = self.robot
+        if robot is not None and robot.frame_depth == 0:
+            robot.begin_frame()
+            self.pose(angle)
+            return robot.commit()
 
         angle = constrain(angle, self.min, self.max)
-        pulse = remap((angle * self.direction), (-90, 90), (self.min_pulse, self.max_pulse))
-        
-        drive(self.channel, self.name, pulse)
-        self.angle = angle
+        pulse = self.pulses[int(round(angle)) - self.min]
         
-        print repr(self), ':', 'pulse', pulse
+        self.driver.setPWM(self.channel, 0, pulse)
+        seconds = self.travel(self.angle, angle)
+        self.angle, self.pulse = angle, pulse
+
+        if self.telemetry is not None:
+            self.telemetry.record(self.index, angle, pulse)
+
+        return seconds
+
+    def travel(self, start, end):
+        """ estimated seconds to move from start to end, from the farthest limit if start is None """
+
+        if start is None:
+            return max(end - self.min, self.max - end) / self.speed
+
+        return abs(end - start) / self.speed
 
     def off(self):
-        drive(self.channel, self.name, 0)
-        self.angle = None
+        self.driver.setPWM(self.channel, 0, 0)
+        self.released()
+
+    def released(self):
+        """ records that the servo is off, after a write that turned off its whole driver """
+
+        self.angle, self.pulse = None, 0
+
+        if self.telemetry is not None:
+            self.telemetry.record(self.index, float('nan'), 0)
 
     def __repr__(self):
         return 'joint: ' + self.joint_type + ' : ' + self.name + ' angle: ' + str(self.angle)
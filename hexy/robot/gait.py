@@ -0,0 +1,232 @@
+from ..comm.bus import simulated_bus
+from .control import ControlLoop
+from .core import joint_keys, joint_properties, joint_addresses, driver1_address, driver2_address
+from .dancing import DancingHexapod
+from array import array
+
+
+class Gait:
+    """ A routine compiled into keyframes: the pulse of every channel of every driver,
+        as one array of 16 * len(addresses) off values per keyframe, the angle of every
+        joint at each keyframe, and the seconds to hold each keyframe. angles are the
+        joint angles it ends on, nan for off joints.
+
+        The changes of each keyframe are worked out once, see deltas(), so playing it
+        costs one register write per driver and keyframe and setting the joints that
+        changed, instead of the angle math of the routine. """
+
+    channels = 16
+
+    def __init__(self, addresses, pulses, delays, angles, poses):
+
+        self.addresses = addresses
+        self.pulses = pulses        # array('H'), keyframe after keyframe
+        self.delays = delays        # array('d'), one per keyframe
+        self.angles = angles        # array('d'), in joint_keys order
+        self.poses = poses          # array('d'), len(joint_keys) angles per keyframe
+
+        self.deltas = deltas(addresses, self.channels, pulses, poses)
+
+    def __len__(self):
+        return len(self.delays)
+
+    @property
+    def duration(self):
+        return sum(self.delays)
+
+    def keyframe(self, i):
+        """ [(address, pulses of its 16 channels)] of keyframe i """
+
+        n = self.channels
+        start = i * n * len(self.addresses)
+        return [(address, self.pulses[start + j * n : start + (j + 1) * n])
+                for j, address in enumerate(self.addresses)]
+
+    def play(self, robot, repeat = 1):
+        """ poses the keyframes on robot paced by its control loop, see Playback """
+
+        playback = Playback(robot, self.addresses)
+        hold = robot.control.hold
+
+        for _ in xrange(repeat):
+            for (changes, writes), delay in zip(self.deltas, self.delays):
+                playback(changes, writes)
+                hold(delay)
+
+
+def deltas(addresses, channels, pulses, poses):
+    """ [(changes, writes)] of every keyframe of pulses and poses, as Playback takes them:
+
+        changes     (joint index, angle or None if off, pulse) of the joints that changed
+        writes      (position of the driver in addresses, first channel, LEDn registers)
+                    from the first to the last channel that changed on the driver
+
+        against the keyframe before, the first keyframe sets every joint and channel so
+        that it can be played from whatever pose the robot is in """
+
+    size = len(joint_keys)
+    positions = [list(addresses).index(joint_addresses[key]) * channels + joint_properties[key][0]
+                 for key in joint_keys]
+    n = channels * len(addresses)
+
+    result = []
+
+    for k in xrange(len(pulses) // n if n else 0):
+        keyframe, pose = pulses[k * n : (k + 1) * n], poses[k * size : (k + 1) * size]
+
+        if k == 0:
+            changed = range(n)
+            joints = range(size)
+        else:
+            before, posed = pulses[(k - 1) * n : k * n], poses[(k - 1) * size : k * size]
+            changed = [i for i in xrange(n) if keyframe[i] != before[i]]
+            joints = [j for j in xrange(size) if keyframe[positions[j]] != before[positions[j]] or
+                      (pose[j] != posed[j] and not (pose[j] != pose[j] and posed[j] != posed[j]))]
+
+        changes = []
+        for j in joints:
+            angle, pulse = pose[j], keyframe[positions[j]]
+            if angle != angle:
+                changes.append((j, None, 0))
+            else:
+                changes.append((j, angle, pulse))
+
+        writes = []
+        for d in xrange(len(addresses)):
+            span = [i - d * channels for i in changed if d * channels <= i < (d + 1) * channels]
+            if span:
+                data = []
+                for off in keyframe[d * channels + span[0] : d * channels + span[-1] + 1]:
+                    data += [0, 0, off & 0xFF, off >> 8]
+                writes.append((d, span[0], data))
+
+        result.append((changes, writes))
+
+    return result
+
+
+class Playback:
+    """ Poses keyframes worked out by deltas() on robot, each as a frame of its own:
+        the registers of each driver are written as they are, in one write, and the
+        joints that changed are set and recorded in telemetry and its log like any pose.
+        Within a frame the caller opened, the changes are buffered into it instead """
+
+    def __init__(self, robot, addresses):
+
+        self.robot = robot
+        self.drivers = [robot.drivers[address] for address in addresses]
+        self.joints = robot.by_index
+
+    def __call__(self, changes, writes):
+
+        robot = self.robot
+        telemetry = robot.telemetry
+        joints = self.joints
+
+        if robot.frame_depth:
+            for index, angle, pulse in changes:
+                joint = joints[index]
+                joint.driver.setPWM(joint.channel, 0, pulse)
+        else:
+            if telemetry.log is not None:
+                telemetry.log.begin()
+            robot.control.mark()
+            for position, first, data in writes:
+                self.drivers[position].writeRegisters(first, data)
+
+        for index, angle, pulse in changes:
+            joint = joints[index]
+            joint.angle, joint.pulse = angle, pulse
+            telemetry.record(index, float('nan') if angle is None else angle, pulse)
+
+        if not robot.frame_depth and telemetry.log is not None:
+            telemetry.log.commit()
+
+
+class Recorder:
+    """ Stands in for sleep() while a routine is compiled: every wait closes a keyframe
+        with the pulses written and the angles posed so far, waits without writes in
+        between add up """
+
+    def __init__(self, drivers, joints):
+
+        self.drivers = drivers
+        self.joints = sorted(joints, key = lambda joint: joint.index)
+        self.time = 0.0
+        self.clear()
+
+    def clear(self):
+
+        self.pulses, self.delays, self.poses = array('H'), array('d'), array('d')
+        self.last = None
+
+    def clock(self):
+        return self.time
+
+    def snapshot(self):
+
+        pulses = array('H')
+
+        for driver in self.drivers:
+            shadow = driver.shadow
+            pulses.extend(shadow[i] | shadow[i + 1] << 8 for i in xrange(2, 64, 4))
+
+        poses = array('d', [float('nan') if joint.angle is None else joint.angle for joint in self.joints])
+
+        return pulses, poses
+
+    def __call__(self, t):
+
+        self.time += t
+        pulses, poses = self.snapshot()
+
+        if pulses == self.last:
+            self.delays[-1] += t
+        elif self.delays and self.delays[-1] == 0:
+            self.pulses[-len(pulses):] = pulses   # a keyframe held for no time is superseded
+            self.poses[-len(poses):] = poses
+            self.delays[-1] = t
+            self.last = pulses
+        else:
+            self.pulses.extend(pulses)
+            self.poses.extend(poses)
+            self.delays.append(t)
+            self.last = pulses
+
+    def finish(self):
+        """ the state the routine ends on, held for no time """
+
+        if self.snapshot()[0] != self.last:
+            self(0.0)
+
+
+def compile_routine(routine, prepare = None, robot_class = DancingHexapod):
+    """ runs routine(robot) once on a robot_class on a simulated bus, after
+        prepare(robot) if given to start from a known pose, and returns its Gait.
+
+        e.g. compile_routine(lambda robot: robot.walk(offset = 25, swing = 25),
+                             prepare = lambda robot: robot.default()).play(hexy, repeat = 10) """
+
+    addresses = [driver1_address, driver2_address]
+
+    robot = robot_class(bus = simulated_bus())
+    drivers = [robot.drivers[address] for address in addresses]
+    recorder = Recorder(drivers, robot.joints)
+    robot.control = ControlLoop(clock = recorder.clock, sleep = recorder)
+
+    if prepare is not None:
+        prepare(robot)
+
+    recorder.clear()
+    recorder(0.0)                                 # the pose the routine starts from
+
+    routine(robot)
+    recorder.finish()
+
+    angles = array('d', [float('nan')]) * len(joint_keys)
+
+    for joint in robot.joints:
+        if joint.angle is not None:
+            angles[joint.index] = joint.angle
+
+    return Gait(addresses, recorder.pulses, recorder.delays, angles, recorder.poses)
@@ -1,5 +1,4 @@
 from core import HexapodCore
-from time import sleep
 
 class Hexapod(HexapodCore):
 
@@ -18,57 +17,74 @@ class Hexapod(HexapodCore):
         self.lie_flat()
         self.curl_up(die = True)
 
-    def curl_up(self, die = False, t = 0.2):
+    def curl_up(self, die = False, t = None):
 
-        for leg in self.legs:
-            leg.pose(hip_angle = 0, 
-                     knee_angle = -(leg.knee.max + leg.knee.leeway), 
-                     ankle_angle = leg.ankle.max)
+        with self.frame():
+            for leg in self.legs:
+                leg.pose(hip_angle = 0, 
+                         knee_angle = -(leg.knee.max + leg.knee.leeway), 
+                         ankle_angle = leg.ankle.max)
 
-        sleep(t)
+        self.hold(t)
 
         if die: self.off()
         
-    def lie_flat(self, t = 0.15):
+    def lie_flat(self, t = None):
         
-        for leg in self.legs:
-            leg.pose()
+        with self.frame():
+            for leg in self.legs:
+                leg.pose()
             
-        sleep(t)
+        self.hold(t)
 
-    def lie_down(self, maxx = 50, step = 4, t = 0.15):
-        
-        for angle in xrange(maxx, -(maxx + 1), -step):
-            self.squat(angle)
+    def lie_down(self, maxx = 50, step = None, t = None, duration = 0.5):
+        """ glides the knees from maxx to -maxx over duration seconds. step is
+            ignored, it is kept so that lie_down(maxx, step, t) calls still work """
+
+        self.squat(maxx)
+        self.glide(self.squat_targets(-maxx), duration)
 
-        sleep(t)
+        self.hold(t)
 
-    def get_up(self, maxx = 70, step = 4):
+    def get_up(self, maxx = 70, step = None, duration = 0.7):
+        """ glides the knees from -maxx to maxx over duration seconds, step is ignored
+            as in lie_down """
 
-        for angle in xrange(-maxx, maxx + 1, step):
-            self.squat(angle)
+        self.squat(-maxx)
+        self.glide(self.squat_targets(maxx), duration)
 
         self.default()
 
-    def look(self, angle = 0, t = 0.05):
+    def look(self, angle = 0, t = None):
         self.neck.pose(angle)
-        sleep(t)
+        self.hold(t)
 
-    def twist_hip(self, angle = 0, t = 0.1):
+    def twist_hip(self, angle = 0, t = None):
 
-        for hip in self.hips:
-            hip.pose(angle)
+        with self.frame():
+            for hip in self.hips:
+                hip.pose(angle)
 
-        sleep(t)
+        self.hold(t)
         
     def squat(self, angle, t = 0):
 
+        with self.frame():
+            for leg in self.legs:
+                leg.move(knee_angle = angle)
+
+        self.hold(t)
+
+    def squat_targets(self, angle):
+
+        targets = {}
+
         for leg in self.legs:
-            leg.move(knee_angle = angle)
+            targets.update(leg.move_targets(knee_angle = angle))
 
-        sleep(t)
+        return targets
 
-    def walk(self, offset = 25 , swing =  25, raised = -30, floor = 50, repetitions = 4, t = 0.2):
+    def walk(self, offset = 25 , swing =  25, raised = -30, floor = 50, repetitions = 4, t = None):
         """ if swing > 0, hexy moves forward else backward """
         
         swings = [offset - swing, swing, -(offset + swing)]
@@ -78,7 +94,7 @@ class Hexapod(HexapodCore):
             self.stride(self.tripod1, self.tripod2, swings, raised, floor, t)
             self.stride(self.tripod2, self.tripod1, reverse_swings, raised, floor, t)
 
-    def rotate(self, offset = 40, raised = -30, floor = 50, repetitions = 5, t = 0.2):
+    def rotate(self, offset = 40, raised = -30, floor = 50, repetitions = 5, t = None):
         """ if offset > 0, hexy rotates left, else right """
        
         for r in xrange(repetitions):
@@ -102,34 +118,37 @@ class Hexapod(HexapodCore):
             second_tripod's legs retrack by swinging to the opposite direction """
 
         self.simultaneous_move(first_tripod, knee_angle = raised)
-        sleep(t)
+        self.hold(t)
         
-        self.simultaneous_move(second_tripod, swing[::-1])
-        self.simultaneous_move(first_tripod, swing, floor)
-        sleep(t)
+        with self.frame():
+            self.simultaneous_move(second_tripod, swing[::-1])
+            self.simultaneous_move(first_tripod, swing, floor)
+        self.hold(t)
 
-    def tilt_side(self, left_angle = 50, right_angle = 0, t = 0.2):
+    def tilt_side(self, left_angle = 50, right_angle = 0, t = None):
         """ if left_angle > right_angle, left side is higher than right side """
         
-        self.uniform_move(legs = self.left_legs, knee_angle = left_angle)
-        self.uniform_move(legs = self.right_legs, knee_angle = right_angle)
-        sleep(t)
+        with self.frame():
+            self.uniform_move(legs = self.left_legs, knee_angle = left_angle)
+            self.uniform_move(legs = self.right_legs, knee_angle = right_angle)
+        self.hold(t)
 
-    def tilt(self, front_angle = 50, middle_angle = 25, back_angle = 0, t = 0.2):
+    def tilt(self, front_angle = 50, middle_angle = 25, back_angle = 0, t = None):
         """ if front_angle > middle_angle > back_angle hexy's front is higher than his back """
 
-        self.right_front.move(knee_angle = front_angle)
-        self.left_front.move(knee_angle = front_angle)
+        with self.frame():
+            self.right_front.move(knee_angle = front_angle)
+            self.left_front.move(knee_angle = front_angle)
 
-        self.right_middle.move(knee_angle = middle_angle)
-        self.left_middle.move(knee_angle = middle_angle)
+            self.right_middle.move(knee_angle = middle_angle)
+            self.left_middle.move(knee_angle = middle_angle)
 
-        self.right_back.move(knee_angle = back_angle)
-        self.left_back.move(knee_angle = back_angle)
+            self.right_back.move(knee_angle = back_angle)
+            self.left_back.move(knee_angle = back_angle)
 
-        sleep(t)
+        self.hold(t)
 
-    def default(self, offset = 45, floor = 60, raised = -30,  t = 0.2):
+    def default(self, offset = 45, floor = 60, raised = -30,  t = None):
         """ Hexy's default pose, offset > 0 brings the front and back legs to the side """ 
         
         swings = [offset, 0, -offset]
@@ -145,16 +164,18 @@ class Hexapod(HexapodCore):
     def uniform_move(self, legs, hip_angle = None, knee_angle = None, t = 0):
         """ moves all legs with hip_angle, knee_angle """
         
-        for leg in legs:
-            leg.move(knee_angle, hip_angle)
+        with self.frame():
+            for leg in legs:
+                leg.move(knee_angle, hip_angle)
 
-        sleep(t)
+        self.hold(t)
 
     def simultaneous_move(self, legs, swings = [None, None, None], knee_angle = None, t = 0):
         """ moves all legs with knee_angle to the respective hip angles at 'swing' """
         
-        for leg, hip_angle in zip(legs, swings):
-            leg.move(knee_angle, hip_angle)
+        with self.frame():
+            for leg, hip_angle in zip(legs, swings):
+                leg.move(knee_angle, hip_angle)
 
-        sleep(t)
+        self.hold(t)
 
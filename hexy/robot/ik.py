@@ -0,0 +1,89 @@
+from collections import OrderedDict
+import numpy as np
+
+""" Leg segment lengths in millimetres, from the hip axis to the knee axis (coxa),
+    knee to ankle (femur) and ankle to the tip of the foot (tibia). Approximate,
+    measure your own robot and pass them to LegIK """
+
+COXA, FEMUR, TIBIA = 26.0, 49.0, 62.0
+
+
+class LegIK:
+    """ Inverse kinematics of all legs at once.
+
+        feet is an array of one (x, y, z) per leg in legs, in millimetres in the leg's
+        own frame: x outwards from the hip axis, y in the direction a positive hip angle
+        turns the leg, z up (the floor is at a negative z). Angles follow the joints:
+        hip 0 points straight out, knee < 0 raises the thigh and ankle is the bend of the
+        lower leg down from the line of the thigh, 90 at a right angle.
+
+        Angles are limited to each joint's min and max, clipped marks the legs whose
+        last targets were out of reach or out of limits. Solutions of up to cache
+        targets, rounded to resolution millimetres, are kept for reuse. """
+
+    def __init__(self, legs, coxa = COXA, femur = FEMUR, tibia = TIBIA, cache = 256, resolution = 0.1):
+
+        self.legs = legs
+        self.coxa, self.femur, self.tibia = coxa, femur, tibia
+        self.resolution = resolution
+
+        self.min = np.array([[joint.min for joint in leg.joints] for leg in legs], dtype = np.float64)
+        self.max = np.array([[joint.max for joint in leg.joints] for leg in legs], dtype = np.float64)
+
+        self.cache, self.size = OrderedDict(), cache
+        self.hits = self.misses = 0
+        self.clipped = np.zeros(len(legs), dtype = bool)
+
+    def solve(self, feet):
+        """ (legs, 3) array of hip, knee and ankle angles in degrees for feet. It is
+            shared with the cache and read-only, copy() it to change it """
+
+        feet = np.asarray(feet, dtype = np.float64).reshape(len(self.legs), 3)
+        key = np.round(feet / self.resolution).astype(np.int64).tobytes()
+
+        if key in self.cache:
+            self.hits += 1
+            angles, self.clipped = self.cache.pop(key)
+            self.cache[key] = angles, self.clipped
+            return angles
+
+        self.misses += 1
+
+        x, y, z = feet[:, 0], feet[:, 1], feet[:, 2]
+        f, t = self.femur, self.tibia
+
+        hip = np.arctan2(y, x)
+        r = np.hypot(x, y) - self.coxa
+        d = np.maximum(np.hypot(r, z), 1e-9)
+
+        elevation_cos = (f * f + d * d - t * t) / (2 * f * d)
+        knee_cos = (f * f + t * t - d * d) / (2 * f * t)
+        reachable = (np.abs(elevation_cos) <= 1) & (np.abs(knee_cos) <= 1)
+
+        elevation = np.arctan2(z, r) + np.arccos(np.clip(elevation_cos, -1, 1))
+        bend = np.pi - np.arccos(np.clip(knee_cos, -1, 1))
+
+        angles = np.degrees(np.column_stack((hip, -elevation, bend)))
+        limited = np.clip(angles, self.min, self.max)
+
+        self.clipped = ~reachable | np.any(limited != angles, axis = 1)
+        limited.flags.writeable = False
+
+        self.cache[key] = limited, self.clipped
+        if len(self.cache) > self.size:
+            self.cache.popitem(last = False)
+
+        return limited
+
+    def targets(self, feet):
+        """ joint : angle of every leg for HexapodCore.glide() """
+
+        return dict((joint, angle) for leg, angles in zip(self.legs, self.solve(feet).tolist())
+                    for joint, angle in zip(leg.joints, angles))
+
+    def pose(self, robot, feet):
+        """ poses the legs at feet in one frame of robot """
+
+        with robot.frame():
+            for leg, (hip, knee, ankle) in zip(self.legs, self.solve(feet).tolist()):
+                leg.pose(hip, knee, ankle)
@@ -0,0 +1,164 @@
+from ..clock import monotonic
+import os
+import struct
+
+""" An append-only log of everything the joints were commanded, for replaying a
+    session later. Every record is a monotonic timestamp, a joint index (see
+    core.joint_keys) or a marker, the pulse and the angle (nan for off) """
+
+RECORD = struct.Struct('<dBHf')
+
+START, BEGIN, COMMIT = 0xFD, 0xFE, 0xFF      # markers in place of a joint index
+
+
+class Journal:
+    """ Appends the poses and frames of a robot to the file at path, as a sink of its
+        telemetry:  hexy.telemetry.log = Journal('plantoid.journal')
+
+        Each Journal starts a new session in the file. Records are buffered by the
+        file, flush() or close() to write them out. With a limit in bytes, a file that
+        grew past it is renamed to path.1 at the end of a frame, replacing the previous
+        one, and a new session is started in a new file at path. """
+
+    def __init__(self, path, limit = None):
+
+        self.path, self.limit = path, limit
+        self.open()
+
+    def open(self):
+
+        self.file = open(self.path, 'ab')
+        self.size = os.path.getsize(self.path)
+        self.record(START, 0.0, 0, monotonic())
+
+    def record(self, joint, angle, pulse, time):
+        self.file.write(RECORD.pack(time, joint, pulse, angle))
+        self.size += RECORD.size
+
+    def begin(self):
+        self.record(BEGIN, 0.0, 0, monotonic())
+
+    def commit(self):
+        self.record(COMMIT, 0.0, 0, monotonic())
+
+        if self.limit is not None and self.size >= self.limit:
+            self.rotate()
+
+    def rotate(self):
+        """ moves the file to path.1 and continues in a new one """
+
+        self.file.close()
+        os.rename(self.path, self.path + '.1')
+        self.open()
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def records(path, chunk = 4096):
+    """ (time, joint or marker, pulse, angle) of every record in the file at path """
+
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(RECORD.size * chunk)
+            for offset in xrange(0, len(data) - RECORD.size + 1, RECORD.size):
+                yield RECORD.unpack_from(data, offset)
+            if len(data) < RECORD.size * chunk:
+                return
+
+
+def sessions(path):
+    """ the number of sessions in the file at path """
+    return sum(1 for record in records(path) if record[1] == START)
+
+
+def replay(path, robot, speed = 1.0, session = None):
+    """ poses the joints of robot as recorded, in the same frames, paced by the control
+        loop of robot at speed times the recorded pace, or as fast as possible if speed
+        is None. session picks one session by index, e.g. -1 for the last one, else
+        all of them are replayed one after the other. Returns the number of poses """
+
+    if session is not None and session < 0:
+        session += sessions(path)
+
+    joints = dict((joint.index, joint) for joint in robot.joints)
+    control = robot.control
+
+    current, origin, start, poses, depth = -1, None, None, 0, 0
+
+    for time, joint, pulse, angle in records(path):
+
+        if joint == START:
+            # a session cut off within a frame, e.g. when the robot was killed, never
+            # committed it, commit it before the next one
+            depth = close_frames(robot, depth)
+            current += 1
+            origin, start = time, control.clock()
+            continue
+
+        if session is not None and current != session:
+            continue
+
+        if speed is not None:
+            deadline = start + (time - origin) / speed
+            if deadline > control.clock():
+                control.wait_until(deadline)
+
+        if joint == BEGIN:
+            robot.begin_frame()
+            depth += 1
+        elif joint == COMMIT and depth > 0:
+            robot.commit()
+            depth -= 1
+        elif angle != angle:
+            joints[joint].off()
+            poses += 1
+        else:
+            joints[joint].pose(angle)
+            poses += 1
+
+    close_frames(robot, depth)
+
+    return poses
+
+
+def close_frames(robot, depth):
+    """ commits the depth frames replay left open, returns 0 """
+
+    for _ in xrange(depth):
+        robot.commit()
+
+    return 0
+
+
+def main():
+
+    import argparse
+    from ..comm.bus import simulated_bus
+    from .dancing import DancingHexapod
+
+    parser = argparse.ArgumentParser(description = "Replays a journal on the robot or on the simulated bus")
+    parser.add_argument('path')
+    parser.add_argument('--speed', type = float, default = 1.0, help = "0 for as fast as possible")
+    parser.add_argument('--session', type = int, default = None, help = "e.g. -1 for the last one, default all")
+    parser.add_argument('--simulated', action = 'store_true', help = "on the simulated bus instead of the drivers")
+    args = parser.parse_args()
+
+    bus = simulated_bus() if args.simulated else None
+    robot = DancingHexapod(bus = bus)
+
+    begin = monotonic()
+    poses = replay(args.path, robot, args.speed or None, args.session)
+    elapsed = monotonic() - begin
+
+    print "%d poses in %.3f s" % (poses, elapsed)
+
+    if bus is not None:
+        print "%d transactions, %d bytes, %.3f s on the bus" % (bus.transactions, bus.bytes, bus.time)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,4 @@
 from hexapod import Hexapod
-from time import sleep
 
 class HexapodPro(Hexapod):
 
@@ -13,22 +12,24 @@ class HexapodPro(Hexapod):
 
     def point(self, t = 0.75):
         
-        self.left_front.hip.pose(-45)
-        self.left_front.knee.pose(-50)
-        self.left_front.ankle.pose(-55)
+        with self.frame():
+            self.left_front.hip.pose(-45)
+            self.left_front.knee.pose(-50)
+            self.left_front.ankle.pose(-55)
 
-        sleep(t)
+        self.hold(t)
 
     def wave(self, repetitions = 5, t = 0.2):
         
-        self.left_front.ankle.pose()
-        self.left_front.knee.pose(-50)
+        with self.frame():
+            self.left_front.ankle.pose()
+            self.left_front.knee.pose(-50)
         
         for r in xrange(repetitions):
             self.left_front.hip.pose(-45)
-            sleep(t)
+            self.hold(t)
             self.left_front.hip.pose(45)
-            sleep(t)
+            self.hold(t)
 
     def dance_twist(self, maxx = 45, step = 5, repetitions = 3, t = 0.01):
 
@@ -50,15 +51,16 @@ class HexapodPro(Hexapod):
         """ brings the back legs even further to the back and the middle legs to the front
             and then brings his front legs up in the air """ 
         
-        self.left_back.replant(raised, back_knee, offset, t)
-        self.right_back.replant(raised, back_knee, -offset, t)
-        self.left_middle.replant(raised, middle_knee, -offset, t)
-        self.right_middle.replant(raised, middle_knee, offset, t)
+        self.replant(self.left_back, raised, back_knee, offset, t)
+        self.replant(self.right_back, raised, back_knee, -offset, t)
+        self.replant(self.left_middle, raised, middle_knee, -offset, t)
+        self.replant(self.right_middle, raised, middle_knee, offset, t)
         
-        self.left_front.pose(-offset, 0, 0)
-        self.right_front.pose(offset, 0, 0)
+        with self.frame():
+            self.left_front.pose(-offset, 0, 0)
+            self.right_front.pose(offset, 0, 0)
 
-        sleep(t)
+        self.hold(t)
 
     def type_stuff(self, up = -40, down = 40, repetitions = 5, t = 0.2):
 
@@ -66,15 +68,17 @@ class HexapodPro(Hexapod):
 
         for r in xrange(repetitions):
 
-            self.left_front.knee.pose(up)
-            self.right_front.knee.pose(down)
-            sleep(t)
+            with self.frame():
+                self.left_front.knee.pose(up)
+                self.right_front.knee.pose(down)
+            self.hold(t)
 
-            self.right_front.knee.pose(up)
-            self.left_front.knee.pose(down)
-            sleep(t)
+            with self.frame():
+                self.right_front.knee.pose(up)
+                self.left_front.knee.pose(down)
+            self.hold(t)
         
-        sleep(t)
+        self.hold(t)
 
     def tilt_left_and_right(self, raised = 60, floor = 20, repetitions = 5, t = 0.15):
         
@@ -106,7 +110,12 @@ class HexapodPro(Hexapod):
     def rock_body(self,  offset = 45, floor = 50, repetitions = 7):
 
         for r in xrange(repetitions):
-            self.uniform_move(self.left_legs, offset, floor, 0)
-            self.uniform_move(self.right_legs, -offset, floor, 0.2)
-            self.uniform_move(self.left_legs, -offset, floor, 0)
-            self.uniform_move(self.right_legs, offset, floor, 0.2)
+            with self.frame():
+                self.uniform_move(self.left_legs, offset, floor, 0)
+                self.uniform_move(self.right_legs, -offset, floor, 0)
+            self.hold(0.2)
+
+            with self.frame():
+                self.uniform_move(self.left_legs, -offset, floor, 0)
+                self.uniform_move(self.right_legs, offset, floor, 0)
+            self.hold(0.2)
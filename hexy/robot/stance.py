@@ -0,0 +1,96 @@
+from functools import wraps
+from heapq import heappush, heappop
+
+
+class StanceGraph:
+    """ The stance a robot was left in and the motions between stances, so that a
+        routine only moves as far as it needs from wherever the last one left the legs
+        instead of every routine resetting them first.
+
+        stances = StanceGraph()
+
+        @stances.motion(None, 'neutral', cost = 4)          # from any stance, also a path step
+        def neutral_stance(): ...
+
+        @stances.motion(['neutral', 'walk'], 'planted')     # a routine, not a path step
+        def step(): ...
+
+        step()      # first takes the cheapest path to 'neutral' or 'walk'
+
+        stance is None while unknown, e.g. before the first motion, from there only the
+        motions that start from any stance lead anywhere. """
+
+    def __init__(self):
+
+        self.stance = None
+        self.edges = []         # (needs or None for any, leaves, cost, motion)
+        self.moved = 0          # path steps taken
+        self.skipped = 0        # motions whose needs were already met
+
+    def motion(self, needs = None, leaves = None, cost = None):
+        """ decorates a motion that starts from one of the stances needs (None: any) and
+            leaves the robot in stance leaves (None: unknown). Calling it first reaches
+            needs. With a cost, e.g. its number of steps, paths may take it with its
+            default arguments """
+
+        def decorate(motion):
+
+            if cost is not None:
+                self.edges.append((needs, leaves, cost, motion))
+
+            @wraps(motion)
+            def move(*args, **kwargs):
+
+                self.reach(needs)
+                self.run(motion, leaves, *args, **kwargs)
+
+            return move
+
+        return decorate
+
+    def run(self, motion, leaves, *args, **kwargs):
+
+        self.stance = None      # unknown should the motion not finish
+        motion(*args, **kwargs)
+        self.stance = leaves
+
+    def plan(self, needs):
+        """ the cheapest list of (motion, leaves) from the current stance to one of the
+            stances needs, empty if already there """
+
+        if needs is None or self.stance in needs:
+            return []
+
+        heap, done, n = [(0, 0, self.stance, [])], set(), 1
+
+        while heap:
+            cost, _, stance, path = heappop(heap)
+
+            if stance in needs:
+                return path
+
+            if stance in done:
+                continue
+            done.add(stance)
+
+            for sources, leaves, step, motion in self.edges:
+                if (sources is None or stance in sources) and leaves not in done:
+                    # n keeps ties in the order the motions were added
+                    heappush(heap, (cost + step, n, leaves, path + [(motion, leaves)]))
+                    n += 1
+
+        raise ValueError("no motions lead from stance %s to %s" % (self.stance, ', '.join(map(str, needs))))
+
+    def reach(self, needs):
+        """ takes the cheapest path to one of the stances needs, returns its motions """
+
+        path = self.plan(needs)
+
+        if not path and needs is not None:
+            self.skipped += 1
+
+        for motion, leaves in path:
+            self.run(motion, leaves)
+            self.moved += 1
+
+        return [motion for motion, leaves in path]
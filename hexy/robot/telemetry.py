@@ -0,0 +1,91 @@
+from ..clock import monotonic
+from array import array
+import sys
+
+
+class Telemetry:
+    """ Fixed-size ring of joint events (joint index, angle, pulse, monotonic timestamp),
+        preallocated so that recording one costs four array stores.
+        Once full, the oldest events are overwritten. An off() is recorded with angle nan.
+        console = True prints the latest event at most once every interval seconds.
+        log, e.g. a hexy.robot.journal.Journal, is also given every event and frame. """
+
+    def __init__(self, size = 1024, names = None, console = False, interval = 1.0):
+
+        self.size = size
+        self.names = names
+
+        self.joints = array('B', [0]) * size
+        self.angles = array('d', [0]) * size
+        self.pulses = array('H', [0]) * size
+        self.times = array('d', [0]) * size
+
+        self.count = 0          # events ever recorded
+        self.drained = 0        # count at the last drain()
+
+        self.console, self.interval = console, interval
+        self.printed_at, self.printed_count = None, 0
+
+        self.log = None
+
+    def record(self, joint, angle, pulse):
+
+        i = self.count % self.size
+        now = monotonic()
+
+        self.joints[i], self.angles[i], self.pulses[i], self.times[i] = joint, angle, pulse, now
+        self.count += 1
+
+        if self.log is not None:
+            self.log.record(joint, angle, pulse, now)
+
+        if self.console and (self.printed_at is None or now - self.printed_at >= self.interval):
+            self.print_event(i, self.count - self.printed_count - 1)
+            self.printed_at, self.printed_count = now, self.count
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def event(self, i):
+        """ (joint, angle, pulse, timestamp) at ring index i, joint by name if names were given """
+
+        joint = self.joints[i]
+        if self.names is not None:
+            joint = self.names[joint]
+
+        return joint, self.angles[i], self.pulses[i], self.times[i]
+
+    def events(self, since = None):
+        """ the buffered events from oldest to newest, only those recorded after count since if given """
+
+        start = self.count - len(self)
+        if since is not None:
+            start = max(start, since)
+
+        return [self.event(n % self.size) for n in xrange(start, self.count)]
+
+    def drain(self):
+        """ the events recorded since the last drain(), those overwritten meanwhile are lost """
+
+        events = self.events(self.drained)
+        self.drained = self.count
+        return events
+
+    def sample(self, n = 10):
+        """ up to n events evenly spaced over the buffer """
+
+        events = self.events()
+        step = max(1, len(events) // n)
+        return events[::step][:n]
+
+    def dump(self, out = None):
+
+        out = out or sys.stdout
+        for joint, angle, pulse, t in self.events():
+            out.write('%.6f %s angle %s pulse %d\n' % (t, joint, angle, pulse))
+
+    def print_event(self, i, skipped):
+
+        joint, angle, pulse, t = self.event(i)
+        more = ' (+%d)' % skipped if skipped > 0 else ''
+        print 'joint:', joint, 'angle:', angle, 'pulse', pulse, more
@@ -0,0 +1,127 @@
+from ..clock import monotonic
+from .core import joint_keys
+from math import exp, log
+
+""" heat gained per second by a powered servo holding at angle 0, by joint type, the
+    knees and ankles carry the body. Heat is in units of the servo's limit, these are
+    uncalibrated starting points """
+
+holding = {'H': 0.002, 'K': 0.005, 'A': 0.004, 'N': 0.0005}
+
+
+class ThermalModel:
+    """ First-order estimate of the heat of every servo from the poses the joints
+        recorded in telemetry. A powered servo heats at its holding rate, more the
+        further it is from 0 degrees, plus move heat for every degree it is moved.
+        All of them cool with time constant tau seconds. 1.0 is the most heat a servo
+        should take.
+
+        update() catches up with telemetry, call it before its ring wraps around. """
+
+    def __init__(self, telemetry, tau = 120.0, holding = holding, move = 0.00005, engage = 0.002):
+
+        self.telemetry = telemetry
+        self.tau, self.move, self.engage = tau, move, engage
+
+        n = len(joint_keys)
+        self.rates = [holding[key[-1]] for key in joint_keys]
+        self.heat = [0.0] * n
+        self.angles = [None] * n
+        self.times = [None] * n
+        self.seen = telemetry.count
+
+    def advance(self, j, t):
+        """ heat of joint j up to time t """
+
+        if self.times[j] is not None:
+            dt = max(0.0, t - self.times[j])
+            decay = exp(-dt / self.tau)
+
+            if self.angles[j] is None:
+                self.heat[j] *= decay
+            else:
+                steady = self.rates[j] * (1 + abs(self.angles[j]) / 90.0) * self.tau
+                self.heat[j] = steady + (self.heat[j] - steady) * decay
+
+        self.times[j] = t
+
+    def update(self, now = None):
+        """ applies the events recorded since the last update and advances every joint to now """
+
+        telemetry = self.telemetry
+        start = max(self.seen, telemetry.count - len(telemetry))
+
+        for n in xrange(start, telemetry.count):
+            i = n % telemetry.size
+            j, angle, t = telemetry.joints[i], telemetry.angles[i], telemetry.times[i]
+
+            self.advance(j, t)
+
+            if angle != angle:
+                self.angles[j] = None
+                continue
+
+            if self.angles[j] is None:
+                self.heat[j] += self.engage
+            else:
+                self.heat[j] += self.move * abs(angle - self.angles[j])
+
+            self.angles[j] = angle
+
+        self.seen = telemetry.count
+
+        if now is not None:
+            for j in xrange(len(self.heat)):
+                self.advance(j, now)
+
+    def cooling(self, j, to):
+        """ seconds joint j needs off to cool down to heat to """
+
+        heat = self.heat[j]
+        return self.tau * log(heat / to) if heat > to else 0.0
+
+
+class RestScheduler:
+    """ Powers down only the servos whose modelled heat reached high and holds them off
+        until the hottest cooled down to low, instead of powering down all of them after
+        every step.
+
+        scheduler = RestScheduler(hexy)
+        ...
+        scheduler.rest()        # between steps """
+
+    def __init__(self, robot, model = None, high = 1.0, low = 0.8, clock = monotonic):
+
+        self.robot = robot
+        self.model = model or ThermalModel(robot.telemetry)
+        self.high, self.low = high, low
+        self.clock = clock          # the one telemetry is timestamped with
+
+        self.rests, self.rested = 0, 0.0
+
+    def hot(self):
+        """ the powered joints at or above high """
+
+        heat = self.model.heat
+        return [joint for joint in self.robot.joints if joint.angle is not None and heat[joint.index] >= self.high]
+
+    def rest(self):
+        """ powers down the hot joints and waits until they cooled down, returns the seconds waited """
+
+        self.model.update(self.clock())
+
+        hot = self.hot()
+        if not hot:
+            return 0.0
+
+        with self.robot.frame():
+            for joint in hot:
+                joint.off()
+
+        seconds = max(self.model.cooling(joint.index, self.low) for joint in hot)
+        self.robot.hold(seconds)
+
+        self.rests += 1
+        self.rested += seconds
+
+        return seconds
@@ -0,0 +1,48 @@
+from math import ceil
+
+
+def linear(s):
+    return s
+
+
+def minimum_jerk(s):
+    """ zero velocity and acceleration at both ends """
+    return s * s * s * (10 - 15 * s + 6 * s * s)
+
+
+profiles = {'linear': linear, 'minimum_jerk': minimum_jerk}
+
+
+class Trajectory:
+    """ Moves each joint in targets (joint : angle) from its current angle to its target
+        over duration seconds, shaped by profile ('linear', 'minimum_jerk' or a function
+        of 0..1 to 0..1). A joint that is off starts at its target. """
+
+    def __init__(self, targets, duration, profile = 'minimum_jerk'):
+
+        self.duration = duration
+        self.profile = profiles[profile] if profile in profiles else profile
+
+        self.paths = []
+
+        for joint, end in targets.items():
+            start = end if joint.angle is None else joint.angle
+            self.paths.append((joint, start, end - start))
+
+    def at(self, t):
+        """ [(joint, angle)] at t seconds into the trajectory """
+
+        s = self.profile(min(1.0, max(0.0, t / float(self.duration)))) if self.duration > 0 else 1.0
+        return [(joint, start + s * change) for joint, start, change in self.paths]
+
+    def ticks(self, rate):
+        """ the number of frames at rate Hz, at least one """
+        return max(1, int(ceil(self.duration * rate)))
+
+    def frames(self, rate):
+        """ at(t) every duration / ticks(rate) seconds, ending exactly on the targets """
+
+        n = self.ticks(rate)
+
+        for i in xrange(1, n + 1):
+            yield self.at(self.duration * i / float(n))
@@ -5,16 +5,45 @@
 # https://github.com/thebiguno/stubby
 
 from hexy.robot.core import *
-import time
-import Adafruit_ADS1x15
+from hexy.comm.ads1115 import ADS1115, ADCStream
+from hexy.plant.runtime import Runtime
+from hexy.plant.policy import Policy
+from hexy.robot.journal import Journal
+from hexy.robot.stance import StanceGraph
+from hexy.robot.thermal import RestScheduler
+import os
 
 
 GAIN = 16 # +/-0.256V
-adc = Adafruit_ADS1x15.ADS1115(address=0x48)
 
-hexy = HexapodCore() # Address: 0x40, 0x41 
-tripod1 = [hexy.right_front, hexy.left_middle, hexy.right_back]
-tripod2 = [hexy.left_front, hexy.right_middle, hexy.left_back]
+JOURNAL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'plantoid.journal') # Every joint command is appended here, replay with python -m hexy.robot.journal. None to not record
+JOURNAL_LIMIT = 8 * 1024 * 1024 # Bytes, beyond that the journal moves to plantoid.journal.1, so at most twice this is kept on the SD card
+
+hexy = tripod1 = tripod2 = servo_rest = None
+
+# Stances the legs are left in, every motion below declares the ones it starts from and
+# the one it leaves, so a routine only resets the legs when it has to
+NEUTRAL_STANCE = 'neutral'          # every foot down, hips, knees and ankles at 0
+WALK_STANCE = 'walk'                # do_walk_stance's
+PLANTED_STANCE = 'planted'          # every foot down, knees and ankles at 0, hips anywhere
+TIPTOE_STANCE = 'tiptoe'            # every foot down and stretched, hips anywhere
+TILT_LEFT, TILT_RIGHT = 'tilt left', 'tilt right'
+TIPTOE_TILT_LEFT, TIPTOE_TILT_RIGHT = 'tiptoe tilt left', 'tiptoe tilt right'
+
+PLANTED_STANCES = [NEUTRAL_STANCE, WALK_STANCE, PLANTED_STANCE]
+
+stances = StanceGraph()
+
+
+def setup(core = None):
+  # NOTE: Pass a HexapodCore to run the routines on it, e.g. one on a simulated bus
+  global hexy, tripod1, tripod2, servo_rest
+
+  hexy = core or HexapodCore() # Address: 0x40, 0x41 
+  stances.stance = None # Unknown until the first stance is taken
+  servo_rest = RestScheduler(hexy)
+  tripod1 = [hexy.right_front, hexy.left_middle, hexy.right_back]
+  tripod2 = [hexy.left_front, hexy.right_middle, hexy.left_back]
 
 # -- 
 # HELPER FUNCTIONS
@@ -22,10 +51,17 @@ tripod2 = [hexy.left_front, hexy.right_middle, hexy.left_back]
 
 def sleep_hack():
   # NOTE: Hexy needs to rest every now and then to prevent servo overloading
+  # Only the servos the thermal model finds too hot are powered down, for as long as they need to cool
   
-  time.sleep(0.25) # TODO: Calibrate this, time it takes to perform the movement
+  hexy.hold() # until the slowest joint of the last step arrived, see joint_speed in hexy.robot.core
+  servo_rest.rest()
+
+def perform(routine):
+  # NOTE: All servos are relaxed while the plant is sampled between behaviors
+  # Only with every foot down, where the relaxed legs are taken to stay for the next behavior
+  routine()
+  stances.reach(PLANTED_STANCES)
   hexy.off()
-  #time.sleep(0.25) # TODO: Calibrate this, time to rest 
 
 # --
 # BASIC LEG FUNCTIONS
@@ -44,97 +80,113 @@ def stretch(leg, new_hip_angle):
 # BASIC HEXAPOD FUNCTIONS
 # --
 
+@stances.motion(None, NEUTRAL_STANCE, cost = 4)
 def do_neutral_stance():
     
   # Raise tripod1
-  for leg in tripod1:
-    bend(leg, new_hip_angle = 0)
+  with hexy.frame():
+    for leg in tripod1:
+      bend(leg, new_hip_angle = 0)
   
   sleep_hack()
   
   # Put tripod1 down
-  for leg in tripod1:
-    neutral(leg, new_hip_angle = 0)
+  with hexy.frame():
+    for leg in tripod1:
+      neutral(leg, new_hip_angle = 0)
 
   sleep_hack()
 
   # Raise tripod2
-  for leg in tripod2:
-    bend(leg, new_hip_angle = 0)
+  with hexy.frame():
+    for leg in tripod2:
+      bend(leg, new_hip_angle = 0)
   
   sleep_hack()
   
   # Put tripod2 down
-  for leg in tripod2:
-    neutral(leg, new_hip_angle = 0)
+  with hexy.frame():
+    for leg in tripod2:
+      neutral(leg, new_hip_angle = 0)
 
   sleep_hack()
 
 
+@stances.motion(None, WALK_STANCE, cost = 4)
 def do_walk_stance(offset = 35):
   
   # Raise tripod1 with appropriate hip angles
-  bend(hexy.right_front, new_hip_angle = -offset)
-  bend(hexy.left_middle, new_hip_angle = 0)
-  bend(hexy.right_back, new_hip_angle = offset)
+  with hexy.frame():
+    bend(hexy.right_front, new_hip_angle = -offset)
+    bend(hexy.left_middle, new_hip_angle = 0)
+    bend(hexy.right_back, new_hip_angle = offset)
   
   sleep_hack()
   
   # Put tripod1 down
-  neutral(hexy.right_front, new_hip_angle = -offset)
-  neutral(hexy.left_middle, new_hip_angle = 0)
-  neutral(hexy.right_back, new_hip_angle = offset)
+  with hexy.frame():
+    neutral(hexy.right_front, new_hip_angle = -offset)
+    neutral(hexy.left_middle, new_hip_angle = 0)
+    neutral(hexy.right_back, new_hip_angle = offset)
   
   sleep_hack()
 
   # Raise tripod2 with appropriate hip angles
-  bend(hexy.left_front, new_hip_angle = offset)
-  bend(hexy.right_middle, new_hip_angle = 0)
-  bend(hexy.left_back, new_hip_angle = -offset)
+  with hexy.frame():
+    bend(hexy.left_front, new_hip_angle = offset)
+    bend(hexy.right_middle, new_hip_angle = 0)
+    bend(hexy.left_back, new_hip_angle = -offset)
   
   sleep_hack()
   
   # Put tripod2 down
-  neutral(hexy.left_front, new_hip_angle = offset)
-  neutral(hexy.right_middle, new_hip_angle = 0)
-  neutral(hexy.left_back, new_hip_angle = -offset)
+  with hexy.frame():
+    neutral(hexy.left_front, new_hip_angle = offset)
+    neutral(hexy.right_middle, new_hip_angle = 0)
+    neutral(hexy.left_back, new_hip_angle = -offset)
   
   sleep_hack()
 
 
+@stances.motion(PLANTED_STANCES, PLANTED_STANCE)
 def rotate(offset = 35):
   # NOTE: Try offset = 35, -35 for clockwise and counterclockwise motion
   
   # Raise tripod1 legs while rotating respective hips
-  for leg in tripod1:
-    bend(leg, new_hip_angle = offset)
+  with hexy.frame():
+    for leg in tripod1:
+      bend(leg, new_hip_angle = offset)
     
   sleep_hack()
   
   # Put down tripod1 legs
-  for leg in tripod1:
-    neutral(leg, new_hip_angle = offset)
+  with hexy.frame():
+    for leg in tripod1:
+      neutral(leg, new_hip_angle = offset)
   
   sleep_hack()
   
   # Raise tripod2 legs while rotating respective hips to other direction
-  for leg in tripod2:
-    bend(leg, new_hip_angle = -offset)
+  with hexy.frame():
+    for leg in tripod2:
+      bend(leg, new_hip_angle = -offset)
   
-  # At the same time, 
-  # Swing tripod1's hips while rotating respective hips to other direction
-  for leg in tripod1: 
-    leg.hip.pose(angle = -offset)
+    # At the same time, 
+    # Swing tripod1's hips while rotating respective hips to other direction
+    for leg in tripod1: 
+      leg.hip.pose(angle = -offset)
   
   sleep_hack()
   
   # Put down tripod2
-  for leg in tripod2:
-    neutral(leg, new_hip_angle = 0)
+  with hexy.frame():
+    for leg in tripod2:
+      neutral(leg, new_hip_angle = 0)
   
   sleep_hack()
 
 
+@stances.motion(PLANTED_STANCES, PLANTED_STANCE)
 def walk(swing = 15):
   # NOTE: Try swing = 15, -15 for backward and forward walk
   
@@ -144,100 +196,110 @@ def walk(swing = 15):
   # Replant tripod1 while tripod2 retracks / moves behind
   
   # ->raise tripod1 with respective hip movement
-  bend(hexy.left_front, new_hip_angle = hip1)
-  bend(hexy.right_middle, new_hip_angle = hip2)
-  bend(hexy.left_back, new_hip_angle = hip3)
+  with hexy.frame():
+    bend(hexy.left_front, new_hip_angle = hip1)
+    bend(hexy.right_middle, new_hip_angle = hip2)
+    bend(hexy.left_back, new_hip_angle = hip3)
   
-  # ->at the same time, swing tripod2 hips to the opposite direction
-  neutral(hexy.right_front, new_hip_angle = hip3)
-  neutral(hexy.left_middle, new_hip_angle = hip2)
-  neutral(hexy.right_back, new_hip_angle = hip1)
+    # ->at the same time, swing tripod2 hips to the opposite direction
+    neutral(hexy.right_front, new_hip_angle = hip3)
+    neutral(hexy.left_middle, new_hip_angle = hip2)
+    neutral(hexy.right_back, new_hip_angle = hip1)
   
   sleep_hack()
   
   # ->put tripod1 down to the floor
-  neutral(hexy.left_front, new_hip_angle = hip1)
-  neutral(hexy.right_middle, new_hip_angle = hip2)
-  neutral(hexy.left_back, new_hip_angle = hip3)
+  with hexy.frame():
+    neutral(hexy.left_front, new_hip_angle = hip1)
+    neutral(hexy.right_middle, new_hip_angle = hip2)
+    neutral(hexy.left_back, new_hip_angle = hip3)
   
   sleep_hack()
 
   # Replant tripod2 while tripod1 retracks / moves behind
  
   # ->raise tripod2 with respective hip movement
-  bend(hexy.right_front, new_hip_angle = -hip1)
-  bend(hexy.left_middle, new_hip_angle = -hip2)
-  bend(hexy.right_back, new_hip_angle = -hip3)
+  with hexy.frame():
+    bend(hexy.right_front, new_hip_angle = -hip1)
+    bend(hexy.left_middle, new_hip_angle = -hip2)
+    bend(hexy.right_back, new_hip_angle = -hip3)
  
-  # ->at the same time, swing tripod1 hips to the opposite direction
-  neutral(hexy.left_front, new_hip_angle = -hip3)
-  neutral(hexy.right_middle, new_hip_angle = -hip2)
-  neutral(hexy.left_back, new_hip_angle = -hip1)
+    # ->at the same time, swing tripod1 hips to the opposite direction
+    neutral(hexy.left_front, new_hip_angle = -hip3)
+    neutral(hexy.right_middle, new_hip_angle = -hip2)
+    neutral(hexy.left_back, new_hip_angle = -hip1)
   
   sleep_hack()
   
   # ->put tripod2 down to the floor
-  neutral(hexy.right_front, new_hip_angle = -hip1)
-  neutral(hexy.left_middle, new_hip_angle = -hip2)
-  neutral(hexy.right_back, new_hip_angle = -hip3)
+  with hexy.frame():
+    neutral(hexy.right_front, new_hip_angle = -hip1)
+    neutral(hexy.left_middle, new_hip_angle = -hip2)
+    neutral(hexy.right_back, new_hip_angle = -hip3)
   
   sleep_hack()
 
 
+@stances.motion([WALK_STANCE, TILT_LEFT], TILT_RIGHT, cost = 1)
 def tilt_right():
-  # NOTE: Assumes that in WALK_STANCE or TILT_LEFT prior to this
   offset = 35 
    
-  bend(hexy.right_front, new_hip_angle = -offset) 
-  bend(hexy.right_middle, new_hip_angle = 0) 
-  bend(hexy.right_back, new_hip_angle = offset) 
+  with hexy.frame():
+    bend(hexy.right_front, new_hip_angle = -offset) 
+    bend(hexy.right_middle, new_hip_angle = 0) 
+    bend(hexy.right_back, new_hip_angle = offset) 
 
-  neutral(hexy.left_front, new_hip_angle = offset) 
-  neutral(hexy.left_middle, new_hip_angle = 0) 
-  neutral(hexy.left_back, new_hip_angle = -offset) 
+    neutral(hexy.left_front, new_hip_angle = offset) 
+    neutral(hexy.left_middle, new_hip_angle = 0) 
+    neutral(hexy.left_back, new_hip_angle = -offset) 
 
   sleep_hack()
 
 
+@stances.motion([WALK_STANCE, TILT_RIGHT], TILT_LEFT, cost = 1)
 def tilt_left():
-  # NOTE: Assumes that in WALK_STANCE or TILT_RIGHT prior to this
   offset = 35 
  
-  neutral(hexy.right_front, new_hip_angle = -offset) 
-  neutral(hexy.right_middle, new_hip_angle = 0) 
-  neutral(hexy.right_back, new_hip_angle = offset) 
+  with hexy.frame():
+    neutral(hexy.right_front, new_hip_angle = -offset) 
+    neutral(hexy.right_middle, new_hip_angle = 0) 
+    neutral(hexy.right_back, new_hip_angle = offset) 
 
-  bend(hexy.left_front, new_hip_angle = offset) 
-  bend(hexy.left_middle, new_hip_angle = 0) 
-  bend(hexy.left_back, new_hip_angle = -offset) 
+    bend(hexy.left_front, new_hip_angle = offset) 
+    bend(hexy.left_middle, new_hip_angle = 0) 
+    bend(hexy.left_back, new_hip_angle = -offset) 
   
   sleep_hack()
 
 
+@stances.motion([NEUTRAL_STANCE], NEUTRAL_STANCE)
 def squat():
-  # NOTE: Assumes that in NEUTRAL_STANCE prior to this    
   
-  for leg in hexy.legs:
-    bend(leg, new_hip_angle = 0)
+  with hexy.frame():
+    for leg in hexy.legs:
+      bend(leg, new_hip_angle = 0)
 
   sleep_hack()
   
-  for leg in hexy.legs:
-    neutral(leg, new_hip_angle = 0)
+  with hexy.frame():
+    for leg in hexy.legs:
+      neutral(leg, new_hip_angle = 0)
  
   sleep_hack()
 
 
+@stances.motion([NEUTRAL_STANCE], NEUTRAL_STANCE)
 def tiptoe():
-  # NOTE: Assumes that in NEUTRAL_STANCE prior to this    
     
-  for leg in hexy.legs:
-    stretch(leg, new_hip_angle = 0)
+  with hexy.frame():
+    for leg in hexy.legs:
+      stretch(leg, new_hip_angle = 0)
  
   sleep_hack()
 
-  for leg in hexy.legs:
-    neutral(leg, new_hip_angle = 0)
+  with hexy.frame():
+    for leg in hexy.legs:
+      neutral(leg, new_hip_angle = 0)
 
   sleep_hack()
 
@@ -245,69 +307,77 @@ def tiptoe():
 # additions
 # --
 
+@stances.motion([WALK_STANCE, TIPTOE_TILT_LEFT], TIPTOE_TILT_RIGHT, cost = 1)
 def tiptoe_tilt_right():
-  # NOTE: Assumes that in WALK_STANCE or TILT_LEFT prior to this
   offset = 35
 
-  neutral(hexy.right_front, new_hip_angle = -offset)
-  neutral(hexy.right_middle, new_hip_angle = 0)
-  neutral(hexy.right_back, new_hip_angle = offset)
+  with hexy.frame():
+    neutral(hexy.right_front, new_hip_angle = -offset)
+    neutral(hexy.right_middle, new_hip_angle = 0)
+    neutral(hexy.right_back, new_hip_angle = offset)
 
-  stretch(hexy.left_front, new_hip_angle = offset)
-  stretch(hexy.left_middle, new_hip_angle = 0)
-  stretch(hexy.left_back, new_hip_angle = -offset)
+    stretch(hexy.left_front, new_hip_angle = offset)
+    stretch(hexy.left_middle, new_hip_angle = 0)
+    stretch(hexy.left_back, new_hip_angle = -offset)
 
   sleep_hack()
 
 
+@stances.motion([WALK_STANCE, TIPTOE_TILT_RIGHT], TIPTOE_TILT_LEFT, cost = 1)
 def tiptoe_tilt_left():
-  # NOTE: Assumes that in WALK_STANCE or TILT_RIGHT prior to this
   offset = 35
 
-  stretch(hexy.right_front, new_hip_angle = -offset)
-  stretch(hexy.right_middle, new_hip_angle = 0)
-  stretch(hexy.right_back, new_hip_angle = offset)
+  with hexy.frame():
+    stretch(hexy.right_front, new_hip_angle = -offset)
+    stretch(hexy.right_middle, new_hip_angle = 0)
+    stretch(hexy.right_back, new_hip_angle = offset)
 
-  neutral(hexy.left_front, new_hip_angle = offset)
-  neutral(hexy.left_middle, new_hip_angle = 0)
-  neutral(hexy.left_back, new_hip_angle = -offset)
+    neutral(hexy.left_front, new_hip_angle = offset)
+    neutral(hexy.left_middle, new_hip_angle = 0)
+    neutral(hexy.left_back, new_hip_angle = -offset)
 
   sleep_hack()
 
 
+@stances.motion(PLANTED_STANCES + [TIPTOE_STANCE], TIPTOE_STANCE)
 def tiptoe_rotate(offset = 35):
   # NOTE: Try offset = 35, -35 for clockwise and counterclockwise motion
 
   # Raise tripod1 legs while rotating respective hips
-  for leg in tripod1:
-    bend(leg, new_hip_angle = offset)
+  with hexy.frame():
+    for leg in tripod1:
+      bend(leg, new_hip_angle = offset)
 
   sleep_hack()
 
   # Put down tripod1 legs
-  for leg in tripod1:
-    stretch(leg, new_hip_angle = offset)
+  with hexy.frame():
+    for leg in tripod1:
+      stretch(leg, new_hip_angle = offset)
 
   sleep_hack()
 
   # Raise tripod2 legs while rotating respective hips to other direction
-  for leg in tripod2:
-    bend(leg, new_hip_angle = -offset)
+  with hexy.frame():
+    for leg in tripod2:
+      bend(leg, new_hip_angle = -offset)
 
-  # At the same time,
-  # Swing tripod1's hips while rotating respective hips to other direction
-  for leg in tripod1:
-    leg.hip.pose(angle = -offset)
+    # At the same time,
+    # Swing tripod1's hips while rotating respective hips to other direction
+    for leg in tripod1:
+      leg.hip.pose(angle = -offset)
 
   sleep_hack()
 
   # Put down tripod2
-  for leg in tripod2:
-    stretch(leg, new_hip_angle = 0)
+  with hexy.frame():
+    for leg in tripod2:
+      stretch(leg, new_hip_angle = 0)
 
   sleep_hack()
 
 
+@stances.motion(PLANTED_STANCES + [TIPTOE_STANCE], TIPTOE_STANCE)
 def tiptoe_walk(swing = 15):
   # NOTE: Try swing = 15, -15 for backward and forward walk
 
@@ -317,42 +387,46 @@ def tiptoe_walk(swing = 15):
   # Replant tripod1 while tripod2 retracks / moves behind
 
   # ->raise tripod1 with respective hip movement
-  bend(hexy.left_front, new_hip_angle = hip1)
-  bend(hexy.right_middle, new_hip_angle = hip2)
-  bend(hexy.left_back, new_hip_angle = hip3)
+  with hexy.frame():
+    bend(hexy.left_front, new_hip_angle = hip1)
+    bend(hexy.right_middle, new_hip_angle = hip2)
+    bend(hexy.left_back, new_hip_angle = hip3)
 
-  # ->at the same time, swing tripod2 hips to the opposite direction
-  stretch(hexy.right_front, new_hip_angle = hip3)
-  stretch(hexy.left_middle, new_hip_angle = hip2)
-  stretch(hexy.right_back, new_hip_angle = hip1)
+    # ->at the same time, swing tripod2 hips to the opposite direction
+    stretch(hexy.right_front, new_hip_angle = hip3)
+    stretch(hexy.left_middle, new_hip_angle = hip2)
+    stretch(hexy.right_back, new_hip_angle = hip1)
 
   sleep_hack()
 
   # ->put tripod1 down to the floor
-  stretch(hexy.left_front, new_hip_angle = hip1)
-  stretch(hexy.right_middle, new_hip_angle = hip2)
-  stretch(hexy.left_back, new_hip_angle = hip3)
+  with hexy.frame():
+    stretch(hexy.left_front, new_hip_angle = hip1)
+    stretch(hexy.right_middle, new_hip_angle = hip2)
+    stretch(hexy.left_back, new_hip_angle = hip3)
 
   sleep_hack()
 
   # Replant tripod2 while tripod1 retracks / moves behind
 
   # ->raise tripod2 with respective hip movement
-  bend(hexy.right_front, new_hip_angle = -hip1)
-  bend(hexy.left_middle, new_hip_angle = -hip2)
-  bend(hexy.right_back, new_hip_angle = -hip3)
+  with hexy.frame():
+    bend(hexy.right_front, new_hip_angle = -hip1)
+    bend(hexy.left_middle, new_hip_angle = -hip2)
+    bend(hexy.right_back, new_hip_angle = -hip3)
 
-  # ->at the same time, swing tripod1 hips to the opposite direction
-  stretch(hexy.left_front, new_hip_angle = -hip3)
-  stretch(hexy.right_middle, new_hip_angle = -hip2)
-  stretch(hexy.left_back, new_hip_angle = -hip1)
+    # ->at the same time, swing tripod1 hips to the opposite direction
+    stretch(hexy.left_front, new_hip_angle = -hip3)
+    stretch(hexy.right_middle, new_hip_angle = -hip2)
+    stretch(hexy.left_back, new_hip_angle = -hip1)
 
   sleep_hack()
 
   # ->put tripod2 down to the floor
-  stretch(hexy.right_front, new_hip_angle = -hip1)
-  stretch(hexy.left_middle, new_hip_angle = -hip2)
-  stretch(hexy.right_back, new_hip_angle = -hip3)
+  with hexy.frame():
+    stretch(hexy.right_front, new_hip_angle = -hip1)
+    stretch(hexy.left_middle, new_hip_angle = -hip2)
+    stretch(hexy.right_back, new_hip_angle = -hip3)
 
   sleep_hack()
 
@@ -362,8 +436,6 @@ def tiptoe_walk_forward(r = 5):
   for i in xrange(0, r):
     tiptoe_walk(swing = 15)
 
-  do_neutral_stance()
-
 
 
 def tiptoe_walk_backward(r = 5):
@@ -371,8 +443,6 @@ def tiptoe_walk_backward(r = 5):
   for i in xrange(0, r):
     tiptoe_walk(swing = -15)
 
-  do_neutral_stance()
-
 
 
 def tiptoe_rotate_cw(r = 5):
@@ -380,8 +450,6 @@ def tiptoe_rotate_cw(r = 5):
   for i in xrange(0, r):
     tiptoe_rotate(offset = 35)
 
-  do_neutral_stance()
-
 
 
 def tiptoe_rotate_ccw(r = 5):
@@ -389,18 +457,13 @@ def tiptoe_rotate_ccw(r = 5):
   for i in xrange(0, r):
     tiptoe_rotate(offset = -35)
 
-  do_neutral_stance()
-
 
 def tiptoe_dance_routine(r = 5):
 
-  do_walk_stance()
-
   for i in xrange(0, r):
     tiptoe_tilt_left()
     tiptoe_tilt_right()
 
-  do_neutral_stance()
 
 # --
 # MOVEMENT FUNCTIONS
@@ -410,8 +473,6 @@ def walk_forward(r = 2):
   
   for i in xrange(0, r):
     walk(swing = 15)
-  
-  do_neutral_stance()
     
 
 def walk_backward(r = 2):
@@ -419,110 +480,106 @@ def walk_backward(r = 2):
   for i in xrange(0, r):
     walk(swing = -15)
   
-  do_neutral_stance()
-
   
 def rotate_cw(r = 2):
 
   for i in xrange(0, r):
     rotate(offset = 35)
   
-  do_neutral_stance()
-
 
 def rotate_ccw(r = 2):
 
   for i in xrange(0, r):
     rotate(offset = -35)
   
-  do_neutral_stance()
-
 
 def squat_routine(r = 2):
   
-  do_neutral_stance()
-
   for i in xrange(0, r):
     squat()
 
 
 def tiptoe_routine(r = 2):
   
-  do_neutral_stance()
-
   for i in xrange(0, r):
     tiptoe()
 
 
 def dance_routine(r = 2):
   
-  do_walk_stance()
-
   for i in xrange(0, r):
     tilt_left()
     tilt_right()
-  
-  do_neutral_stance()
+
+# --
+# BEHAVIOR
+# --
+
+# Routines a behavior policy can select by name
+routines = dict((routine.__name__, routine) for routine in [
+  do_neutral_stance, do_walk_stance, tilt_right, tilt_left, squat, tiptoe,
+  tiptoe_tilt_right, tiptoe_tilt_left, tiptoe_walk_forward, tiptoe_walk_backward,
+  tiptoe_rotate_cw, tiptoe_rotate_ccw, tiptoe_dance_routine,
+  walk_forward, walk_backward, rotate_cw, rotate_ccw, squat_routine, tiptoe_routine, dance_routine])
+
+POLICY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'plantoid_policy.json')
+
+policy = None
+
+def select_behavior(value):
+  # NOTE: Returns (routine, seconds to rest after it) for a reading, None to keep sampling
+  # The bands are in plantoid_policy.json, edit it while running to change them
+  global policy
+
+  if policy is None:
+    policy = Policy(POLICY, routines)
+
+  band = policy.current
+  choice = policy.select(value)
+
+  # Only print the reading when it moves to another band, not on every poll
+  if policy.current != band:
+    print value
+
+  if choice is None:
+    return None
+
+  routine, rest = choice
+  return (lambda: perform(routine)), rest
 
 # --
 # MAIN
 # --
 
-do_neutral_stance()
-#walk_forward(r=1)
-#tiptoe_tilt_right()
-#tiptoe_tilt_left()
-#tiptoe_dance_routine()
-#tiptoe_rotate_cw()
-#tiptoe_rotate_ccw()
-#tiptoe_rotate()
-#tiptoe_walk_backward()
-#tiptoe_walk_forward()
-#while True:
-#  walk_forward()
-
-while True:
-  
-  value = adc.read_adc_difference(0, gain = GAIN, data_rate = 860)
-  # 0 = Channel 0 minus channel 1
-  print value
-  
-  if value*-1 <= 4:
-    print("Neutral stance")
-    do_neutral_stance()
-    sleep(5.0)
-  
-  if 4 < value*-1 <= 45:
-    print("Rotate clock wise")
-    rotate_cw(r = 3)
-    sleep(randint(4,150))
-  
-  if 45 < value*-1 <= 150:
-    print("Rotate counter clock wise")
-    rotate_ccw(r = 3)
-    sleep(randint(4,150))
-
-  if 150 < value*-1 <= 660:
-    print("Walk forward")
-    walk_forward(r = 5)
-    sleep(randint(4,150))
-
-  if 660 < value*-1 <= 950:
-    print("Walk backward")
-    walk_backward(r = 5)
-    sleep(randint(4,150))
-  
-  if 950 < value*-1 <= 1400:
-    print("Squat")
-    squat_routine(r = 2)
-    sleep(randint(4,150))
-
-  if 1800 < value*-1 <= 1900:
-    print("Tilt right")
-    tilt_right()
-    sleep(randint(4,150))
+if __name__ == '__main__':
 
-  if 1900 < value*-1 <= 2200:
-    print("Tilt left")
-    tilt_left()
-    sleep(randint(4,150))
+  setup()
+
+  if JOURNAL is not None:
+    hexy.telemetry.log = Journal(JOURNAL, limit = JOURNAL_LIMIT)
+
+  do_neutral_stance()
+  #walk_forward(r=1)
+  #tiptoe_tilt_right()
+  #tiptoe_tilt_left()
+  #tiptoe_dance_routine()
+  #tiptoe_rotate_cw()
+  #tiptoe_rotate_ccw()
+  #tiptoe_rotate()
+  #tiptoe_walk_backward()
+  #tiptoe_walk_forward()
+  #while True:
+  #  walk_forward()
+
+  # The ADC converts continuously and is read on its own thread while the robot moves or rests
+  # 0 = Channel 0 minus channel 1
+  adc = ADCStream(ADS1115(address=0x48), differential = 0, gain = GAIN, data_rate = 860)
+  # Behaviors are selected on the median of the last 0.1 s rather than a single raw sample
+  from hexy.plant.features import Features
+  features = Features(adc, window = 1024, block = 86, key = 'moving_median')
+  runtime = Runtime(features, select_behavior)
+  try:
+    runtime.run()
+  finally:
+    if hexy.telemetry.log is not None:
+      hexy.telemetry.log.close()
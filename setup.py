@@ -7,5 +7,6 @@ setup(name = 'hexy',
       author = 'Mithi',
       author_email = 'mithi.sevilla@gmail.com',
       license = 'MIT',
-      packages = ['hexy', 'hexy.robot', 'hexy.demo', 'hexy.comm'],
+      packages = ['hexy', 'hexy.robot', 'hexy.demo', 'hexy.comm', 'hexy.bench', 'hexy.plant'],
+      package_data = {'hexy.bench': ['baseline.json']},
       zip_safe = False)